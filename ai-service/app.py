@@ -1,12 +1,22 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
 from flask_cors import CORS
+import json
 import os
+import time
 from dotenv import load_dotenv
 import numpy as np
 from services.dropout_predictor import DropoutPredictor
 from services.performance_predictor import PerformancePredictor
 from services.activity_recommender import ActivityRecommender
 from services.student_clusterer import StudentClusterer
+from services.drift_monitor import DriftMonitor
+from services.recommendation_store import RecommendationStore
+from services.student_index import StudentIndex
+from services.shared_cache import SharedArrayCache
+from services.cluster_snapshots import ClusterSnapshotStore
+from services.tenants import TenantRegistry, TenantMetrics, TenantBusy, UnknownTenant, TENANT_ID, DEFAULT_TENANT
+from services.job_queue import JobQueue, JobDeferred
+from services.enrollment_allocator import EnrollmentAllocator
 
 # Load environment variables
 load_dotenv()
@@ -15,11 +25,285 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app)
 
-# Initialize AI services
-dropout_predictor = DropoutPredictor()
-performance_predictor = PerformancePredictor()
-activity_recommender = ActivityRecommender()
-student_clusterer = StudentClusterer()
+# Host-wide cache shared by all worker processes (opt-in)
+shared_cache = None
+if os.getenv('SHARED_CACHE_ENABLED', 'false').lower() == 'true':
+    shared_cache = SharedArrayCache(os.getenv('SHARED_CACHE_DIR') or None)
+
+TENANT_DIR = os.getenv('TENANT_DIR', os.path.join('models', 'tenants'))
+MB = 1024 * 1024
+
+def build_tenant_services(tenant_id):
+    """
+    Create one tenant's AI services. The default tenant keeps the original
+    paths; every other school gets its own directory for models, snapshots
+    and the recommendation table, and its own namespace in the shared cache
+    when that is enabled.
+    """
+    if tenant_id == DEFAULT_TENANT:
+        data_dir = 'models'
+        model_dir = 'models'
+        cache = shared_cache
+        snapshot_dir = os.getenv('CLUSTER_SNAPSHOT_DIR', os.path.join('models', 'cluster_snapshots'))
+        store_path = os.getenv('RECOMMENDATION_STORE_PATH', os.path.join('models', 'recommendations.kv'))
+    else:
+        data_dir = os.path.join(TENANT_DIR, tenant_id)
+        # Schools without their own trained dropout model use the default one
+        has_model = any(
+            os.path.exists(os.path.join(data_dir, name))
+            for name in ('dropout_kernel.npz', 'dropout_model.pkl')
+        )
+        model_dir = data_dir if has_model else 'models'
+        cache = SharedArrayCache(os.path.join(shared_cache.root, 'tenants', tenant_id)) if shared_cache else None
+        snapshot_dir = os.path.join(data_dir, 'cluster_snapshots')
+        store_path = os.path.join(data_dir, 'recommendations.kv')
+    
+    return {
+        'dropout_predictor': DropoutPredictor(shared_cache=cache, model_dir=model_dir),
+        'performance_predictor': PerformancePredictor(),
+        'activity_recommender': ActivityRecommender(),
+        'student_clusterer': StudentClusterer(model_dir=data_dir),
+        'student_index': StudentIndex(
+            rebuild_fraction=float(os.getenv('STUDENT_INDEX_REBUILD_FRACTION', 0.05)),
+            rebuild_min=int(os.getenv('STUDENT_INDEX_REBUILD_MIN', 1024)),
+            shared_cache=cache
+        ),
+        'cluster_snapshots': ClusterSnapshotStore(
+            snapshot_dir,
+            limit=int(os.getenv('CLUSTER_SNAPSHOT_LIMIT', 50))
+        ),
+        'recommendation_store': RecommendationStore(store_path),
+        'enrollment_allocator': EnrollmentAllocator(
+            eps=float(os.getenv('ALLOCATION_EPSILON', 0.001)),
+            rank_weight=float(os.getenv('ALLOCATION_RANK_WEIGHT', 1.0)),
+            fit_weight=float(os.getenv('ALLOCATION_FIT_WEIGHT', 0.5))
+        ),
+        'drift_monitor': DriftMonitor(
+            window_seconds=int(os.getenv('DRIFT_WINDOW_SECONDS', 3600)),
+            history=int(os.getenv('DRIFT_WINDOW_HISTORY', 24)),
+            psi_threshold=float(os.getenv('DRIFT_PSI_THRESHOLD', 0.2))
+        )
+    }
+
+def _tenant_overrides():
+    """Per-tenant limits, e.g. {"district-1": {"memory_budget_mb": 1024, "max_concurrency": 16}}"""
+    overrides = {}
+    for tenant_id, values in json.loads(os.getenv('TENANT_OVERRIDES') or '{}').items():
+        overrides[tenant_id] = {}
+        if 'memory_budget_mb' in values:
+            overrides[tenant_id]['memory_budget'] = int(values['memory_budget_mb'] * MB)
+        if 'max_concurrency' in values:
+            overrides[tenant_id]['max_concurrency'] = int(values['max_concurrency'])
+    return overrides
+
+# Initialize AI services, partitioned by tenant (school)
+tenant_overrides = _tenant_overrides()
+tenant_metrics = TenantMetrics()
+tenants = TenantRegistry(
+    build_tenant_services,
+    memory_budget=int(float(os.getenv('TENANT_MEMORY_BUDGET_MB', 256)) * MB),
+    global_memory_budget=int(float(os.getenv('TENANT_GLOBAL_MEMORY_BUDGET_MB', 2048)) * MB),
+    max_concurrency=int(os.getenv('TENANT_MAX_CONCURRENCY', 8)),
+    queue_timeout=float(os.getenv('TENANT_QUEUE_TIMEOUT_SECONDS', 2)),
+    overrides=tenant_overrides,
+    metrics=tenant_metrics,
+    # Schools served besides the default tenant; unknown ids get a 404
+    allowed=[t.strip() for t in os.getenv('TENANTS', '').split(',') if t.strip()] + list(tenant_overrides)
+)
+tenants.get(DEFAULT_TENANT)
+
+def tenant_job(handler):
+    """
+    Run a job handler inside one of its tenant's concurrency slots, like a
+    request, so jobs count against the tenant's limit and the tenant is not
+    evicted mid-job. A busy tenant puts the job back in the queue.
+    """
+    def run(tenant_id, payload, progress):
+        try:
+            tenant = tenants.acquire(tenant_id)
+        except TenantBusy as e:
+            raise JobDeferred(str(e))
+        try:
+            return handler(tenant, payload, progress)
+        finally:
+            tenants.release(tenant)
+    return run
+
+# Request validators shared by the synchronous endpoints and /jobs, so a
+# queued job is checked before it is accepted. Each returns an error
+# message, or None if the payload is valid.
+
+def _student_list(data, field):
+    students = data.get(field)
+    if not students or not isinstance(students, list):
+        return f"{field} is required"
+    if any(not isinstance(student, dict) for student in students):
+        return f"every entry in {field} must be an object"
+    return None
+
+def validate_cluster_students(data):
+    return _student_list(data, 'student_data')
+
+def validate_score_dropout(data):
+    return _student_list(data, 'students')
+
+def validate_precompute_recommendations(data):
+    error = _student_list(data, 'students')
+    if error is None and any(not student.get('student_id') for student in data['students']):
+        error = 'student_id is required for every student'
+    return error
+
+def validate_allocate_enrollments(data):
+    max_per_student = data.get('max_per_student', 1)
+    if not data.get('students') or not data.get('activities'):
+        return 'students and activities are required'
+    error = _student_list(data, 'students')
+    if error is None and any(student.get('student_id') is None for student in data['students']):
+        error = 'student_id is required for every student'
+    if error is None and (not isinstance(max_per_student, int) or isinstance(max_per_student, bool)
+                          or max_per_student < 1):
+        error = 'max_per_student must be a positive integer'
+    return error
+
+def observe_clustering(tenant, student_data):
+    """Feed a cohort's clustering features to the drift monitor as one batch"""
+    tenant.drift_monitor.observe('clustering', {
+        'attendance_percentage': [s.get('attendance_percentage', 0) for s in student_data],
+        'average_score': [s.get('average_score', 0) for s in student_data],
+        'skill_level': [StudentClusterer.SKILL_MAP.get(s.get('skill_level', 'beginner'), 1) for s in student_data],
+        'batch_size': len(student_data)
+    })
+
+def observe_dropout(tenant, students):
+    """Feed a cohort's dropout features to the drift monitor as one batch"""
+    tenant.drift_monitor.observe('dropout', {
+        name: [student.get(name) for student in students]
+        for name in ('attendance_percentage', 'average_score', 'total_sessions', 'days_enrolled')
+    })
+
+def cluster_students_job(tenant, payload, progress):
+    """Cluster a cohort; members are paged through /cluster-snapshots"""
+    observe_clustering(tenant, payload['student_data'])
+    progress(0.1, 'Clustering students')
+    result = tenant.student_clusterer.cluster(payload['student_data'])
+    progress(0.9, 'Saving snapshot')
+    snapshot = tenant.cluster_snapshots.save(result)
+    if payload.get('save_reference'):
+        # Simple grouping for tiny cohorts has no centroids to export
+        snapshot['reference_saved'] = result['kernel'] is not None
+        if result['kernel'] is not None:
+            tenant.student_clusterer.export_kernel(result['kernel'])
+    return snapshot
+
+def score_dropout_job(tenant, payload, progress):
+    """Dropout risk for every student in a cohort"""
+    predictor = tenant.dropout_predictor
+    students = payload['students']
+    observe_dropout(tenant, students)
+    scores = []
+    for i, student in enumerate(students):
+        result = predictor.predict(student)
+        scores.append({
+            'student_id': student.get('student_id'),
+            'risk_level': result['risk_level'],
+            'risk_score': result['prediction']['risk_score'],
+            'model_probability': result['prediction']['model_probability'],
+            'factors': result['factors']
+        })
+        if i % 1000 == 0:
+            progress(i / len(students), f"Scored {i} of {len(students)} students")
+    return {
+        'total_students': len(scores),
+        'risk_counts': {
+            level: sum(1 for score in scores if score['risk_level'] == level)
+            for level in ('high', 'medium', 'low')
+        },
+        'scores': scores
+    }
+
+def precompute_recommendations_job(tenant, payload, progress):
+    progress(0.1, 'Building recommendation table')
+    return tenant.recommendation_store.build(tenant.activity_recommender, payload['students'])
+
+def allocate_enrollments_job(tenant, payload, progress):
+    progress(0.1, 'Allocating seats')
+    result = tenant.enrollment_allocator.allocate(
+        payload['students'], payload['activities'],
+        max_per_student=payload.get('max_per_student', 1),
+        recommender=tenant.activity_recommender,
+        store=tenant.recommendation_store
+    )
+    return result
+
+# Job type -> (handler, payload validator)
+JOB_TYPES = {
+    'cluster_students': (cluster_students_job, validate_cluster_students),
+    'score_dropout': (score_dropout_job, validate_score_dropout),
+    'precompute_recommendations': (precompute_recommendations_job, validate_precompute_recommendations),
+    'allocate_enrollments': (allocate_enrollments_job, validate_allocate_enrollments)
+}
+
+# Durable queue for analytics that outlive an HTTP request timeout
+jobs = JobQueue(
+    os.getenv('JOB_DB_PATH', os.path.join('models', 'jobs.sqlite3')),
+    {job_type: tenant_job(handler) for job_type, (handler, _) in JOB_TYPES.items()},
+    workers=int(os.getenv('JOB_WORKERS', 2)),
+    result_ttl=int(os.getenv('JOB_RESULT_TTL_SECONDS', 86400)),
+    lease_seconds=int(os.getenv('JOB_LEASE_SECONDS', 60)),
+    max_attempts=int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+)
+# Under the debug reloader this module also runs in the parent process,
+# which only watches files; workers there would never see code reloads
+if not (__name__ == '__main__' and os.getenv('FLASK_ENV') == 'development'
+        and os.getenv('WERKZEUG_RUN_MAIN') != 'true'):
+    jobs.start()
+
+# Endpoints that are not routed to a tenant
+UNTENANTED_ENDPOINTS = {None, 'static', 'home', 'health', 'metrics'}
+
+@app.before_request
+def enter_tenant():
+    """Route the request to its tenant and reserve a concurrency slot"""
+    if request.method == 'OPTIONS' or request.endpoint in UNTENANTED_ENDPOINTS:
+        return None
+    
+    tenant_id = request.headers.get('X-Tenant-ID') or request.args.get('tenant_id') or DEFAULT_TENANT
+    if not TENANT_ID.match(tenant_id):
+        return jsonify({
+            'success': False,
+            'message': 'Invalid tenant id'
+        }), 400
+    
+    g.tenant_id = tenant_id
+    g.started_at = time.perf_counter()
+    try:
+        g.tenant = tenants.acquire(tenant_id)
+    except UnknownTenant as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 404
+    except TenantBusy as e:
+        tenant_metrics.rejected(tenant_id)
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 429
+    return None
+
+@app.after_request
+def record_tenant_metrics(response):
+    if 'tenant' in g:
+        tenant_metrics.observe(
+            g.tenant_id, request.endpoint, response.status_code, time.perf_counter() - g.started_at
+        )
+    return response
+
+@app.teardown_request
+def leave_tenant(error):
+    tenant = g.pop('tenant', None)
+    if tenant is not None:
+        tenants.release(tenant)
 
 @app.route('/', methods=['GET'])
 def home():
@@ -32,22 +316,34 @@ def home():
             'dropout_prediction': '/predict-dropout',
             'performance_prediction': '/predict-performance',
             'activity_recommendation': '/recommend-activity',
-            'student_clustering': '/cluster-students'
+            'student_clustering': '/cluster-students',
+            'cluster_snapshots': '/cluster-snapshots/<snapshot_id>',
+            'similar_students': '/similar-students',
+            'enrollment_allocation': '/allocate-enrollments',
+            'jobs': '/jobs',
+            'input_drift': '/drift',
+            'metrics': '/metrics'
         }
     })
 
 @app.route('/health', methods=['GET'])
 def health():
-    """Health check endpoint"""
+    """Health check endpoint; reports the default tenant without taking a request slot"""
+    tenant = tenants.get(DEFAULT_TENANT)
     return jsonify({
         'success': True,
         'status': 'healthy',
         'service': 'AI Service',
+        'tenant': DEFAULT_TENANT,
         'models_loaded': {
-            'dropout_predictor': dropout_predictor.is_ready(),
-            'performance_predictor': performance_predictor.is_ready(),
-            'activity_recommender': activity_recommender.is_ready(),
-            'student_clusterer': student_clusterer.is_ready()
+            'dropout_predictor': tenant.dropout_predictor.is_ready(),
+            'performance_predictor': tenant.performance_predictor.is_ready(),
+            'activity_recommender': tenant.activity_recommender.is_ready(),
+            'recommendation_store': tenant.recommendation_store.is_ready(),
+            'student_clusterer': tenant.student_clusterer.is_ready(),
+            'student_index': tenant.student_index.is_ready(),
+            'enrollment_allocator': tenant.enrollment_allocator.is_ready(),
+            'job_queue': jobs.is_ready()
         }
     })
 
@@ -76,8 +372,15 @@ def predict_dropout():
                 'message': 'student_data is required'
             }), 400
         
+        g.tenant.drift_monitor.observe('dropout', {
+            'attendance_percentage': student_data.get('attendance_percentage'),
+            'average_score': student_data.get('average_score'),
+            'total_sessions': student_data.get('total_sessions'),
+            'days_enrolled': student_data.get('days_enrolled')
+        })
+        
         # Predict dropout risk
-        result = dropout_predictor.predict(student_data)
+        result = g.tenant.dropout_predictor.predict(student_data)
         
         return jsonify({
             'success': True,
@@ -120,8 +423,13 @@ def predict_performance():
                 'message': 'performance_data is required'
             }), 400
         
+        g.tenant.drift_monitor.observe('performance', {
+            'score': [item.get('score') for item in performance_data if item.get('score') is not None],
+            'evaluation_count': len(performance_data)
+        })
+        
         # Predict performance
-        result = performance_predictor.predict(performance_data)
+        result = g.tenant.performance_predictor.predict(performance_data)
         
         return jsonify({
             'success': True,
@@ -165,13 +473,107 @@ def recommend_activity():
                 'message': 'student_id is required'
             }), 400
         
-        # Get recommendations
-        result = activity_recommender.recommend(student_id, enrollment_history)
+        g.tenant.drift_monitor.observe('recommendation', {
+            'history_length': len(enrollment_history),
+            'avg_score': [item.get('avg_score') for item in enrollment_history if item.get('avg_score') is not None]
+        })
+        
+        # Serve from the precomputed table; only compute live on a miss.
+        # A posted history must match the one the entry was computed from.
+        result = g.tenant.recommendation_store.get(
+            student_id,
+            enrollment_history if 'enrollment_history' in data else None
+        )
+        source = 'precomputed'
+        
+        if result is None:
+            result = g.tenant.activity_recommender.recommend(student_id, enrollment_history)
+            source = 'live'
         
         return jsonify({
             'success': True,
             'recommendations': result['recommendations'],
-            'reasoning': result['reasoning']
+            'reasoning': result['reasoning'],
+            'source': source
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@app.route('/recommend-activity/precompute', methods=['POST'])
+def precompute_recommendations():
+    """
+    Precompute recommendations for every student and replace the
+    materialized recommendation table
+    
+    Expected input:
+    {
+        "students": [
+            {
+                "student_id": int,
+                "enrollment_history": [
+                    {
+                        "category": str,
+                        "avg_score": float
+                    }
+                ]
+            }
+        ]
+    }
+    """
+    try:
+        data = request.get_json()
+        error = validate_precompute_recommendations(data)
+        
+        if error:
+            return jsonify({
+                'success': False,
+                'message': error
+            }), 400
+        
+        result = g.tenant.recommendation_store.build(g.tenant.activity_recommender, data['students'])
+        
+        return jsonify({
+            'success': True,
+            **result
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@app.route('/recommend-activity/invalidate', methods=['POST'])
+def invalidate_recommendations():
+    """
+    Invalidate precomputed recommendations for students whose enrollments
+    changed
+    
+    Expected input:
+    {
+        "student_ids": [int]
+    }
+    """
+    try:
+        data = request.get_json()
+        student_ids = data.get('student_ids')
+        
+        if not student_ids:
+            return jsonify({
+                'success': False,
+                'message': 'student_ids is required'
+            }), 400
+        
+        invalidated = g.tenant.recommendation_store.invalidate(student_ids)
+        
+        return jsonify({
+            'success': True,
+            'invalidated': invalidated,
+            'store': g.tenant.recommendation_store.stats()
         })
         
     except Exception as e:
@@ -183,7 +585,8 @@ def recommend_activity():
 @app.route('/cluster-students', methods=['POST'])
 def cluster_students():
     """
-    Cluster students based on performance and engagement
+    Cluster students based on performance and engagement. The result is
+    stored as a snapshot that can be paged through with /cluster-snapshots.
     
     Expected input:
     {
@@ -195,6 +598,86 @@ def cluster_students():
                 "average_score": float,
                 "skill_level": str
             }
+        ],
+        "include_members": bool,      // default true; false returns sizes only
+        "since_snapshot_id": str,     // optional; adds the first delta page
+        "save_reference": bool,       // export this run for /cluster-students/assign
+        "async": bool                 // run as a background job; poll /jobs/<job_id>
+    }
+    """
+    try:
+        data = request.get_json()
+        student_data = data.get('student_data')
+        include_members = data.get('include_members', True)
+        since_snapshot_id = data.get('since_snapshot_id')
+        error = validate_cluster_students(data)
+        
+        if error:
+            return jsonify({
+                'success': False,
+                'message': error
+            }), 400
+        
+        if data.get('async'):
+            # The job feeds the drift monitor when it runs
+            job, deduplicated = jobs.submit(g.tenant_id, 'cluster_students', {
+                'student_data': student_data,
+                'save_reference': bool(data.get('save_reference'))
+            })
+            return _job_accepted(job, deduplicated)
+        
+        observe_clustering(g.tenant, student_data)
+        
+        # Cluster students
+        result = g.tenant.student_clusterer.cluster(student_data)
+        snapshot = g.tenant.cluster_snapshots.save(result)
+        
+        response = {
+            'success': True,
+            'snapshot_id': snapshot['snapshot_id'],
+            'cluster_sizes': snapshot['cluster_sizes'],
+            'cluster_descriptions': result['descriptions']
+        }
+        
+        if include_members:
+            response['clusters'] = result['clusters']
+        
+        if data.get('save_reference'):
+            # Simple grouping for tiny cohorts has no centroids to export
+            response['reference_saved'] = result['kernel'] is not None
+            if result['kernel'] is not None:
+                g.tenant.student_clusterer.export_kernel(result['kernel'])
+        
+        if since_snapshot_id:
+            try:
+                response['delta'] = g.tenant.cluster_snapshots.delta(
+                    snapshot['snapshot_id'], since_snapshot_id, limit=_page_limit(data.get('limit'))
+                )
+            except KeyError:
+                response['delta'] = None
+        
+        return jsonify(response)
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@app.route('/cluster-students/assign', methods=['POST'])
+def assign_students():
+    """
+    Assign students to the saved reference clusters without refitting
+    
+    Expected input:
+    {
+        "student_data": [
+            {
+                "student_id": int,
+                "attendance_percentage": float,
+                "average_score": float,
+                "skill_level": str
+            }
         ]
     }
     """
@@ -208,13 +691,426 @@ def cluster_students():
                 'message': 'student_data is required'
             }), 400
         
-        # Cluster students
-        result = student_clusterer.cluster(student_data)
+        observe_clustering(g.tenant, student_data)
+        assignments = g.tenant.student_clusterer.assign(student_data)
         
         return jsonify({
             'success': True,
-            'clusters': result['clusters'],
-            'cluster_descriptions': result['descriptions']
+            'assignments': assignments
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+def _page_limit(value, default=100, maximum=1000):
+    """Clamp a client-supplied page size"""
+    try:
+        return max(1, min(maximum, int(value)))
+    except (TypeError, ValueError):
+        return default
+
+def _snapshot_response(payload):
+    """Snapshots are immutable, so let polling clients revalidate with ETags"""
+    response = jsonify({'success': True, **payload})
+    response.set_etag(payload['snapshot_id'] + request.query_string.decode())
+    response.cache_control.private = True
+    response.cache_control.max_age = 0
+    return response.make_conditional(request)
+
+@app.route('/cluster-snapshots/<snapshot_id>', methods=['GET'])
+def cluster_snapshot(snapshot_id):
+    """Cluster descriptions and sizes of a stored snapshot, without members"""
+    try:
+        return _snapshot_response(g.tenant.cluster_snapshots.summary(snapshot_id))
+        
+    except KeyError as e:
+        return jsonify({
+            'success': False,
+            'message': e.args[0]
+        }), 404
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@app.route('/cluster-snapshots/<snapshot_id>/clusters/<cluster_name>', methods=['GET'])
+def cluster_snapshot_members(snapshot_id, cluster_name):
+    """
+    Page through the members of one cluster
+    
+    Query parameters: cursor (from the previous page), limit (default 100)
+    """
+    try:
+        page = g.tenant.cluster_snapshots.members(
+            snapshot_id,
+            cluster_name,
+            cursor=request.args.get('cursor'),
+            limit=_page_limit(request.args.get('limit'))
+        )
+        return _snapshot_response(page)
+        
+    except KeyError as e:
+        return jsonify({
+            'success': False,
+            'message': e.args[0]
+        }), 404
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@app.route('/cluster-snapshots/<snapshot_id>/delta', methods=['GET'])
+def cluster_snapshot_delta(snapshot_id):
+    """
+    Students whose cluster changed since an earlier snapshot
+    
+    Query parameters: since (snapshot id, required), cursor, limit
+    """
+    try:
+        since = request.args.get('since')
+        
+        if not since:
+            return jsonify({
+                'success': False,
+                'message': 'since is required'
+            }), 400
+        
+        page = g.tenant.cluster_snapshots.delta(
+            snapshot_id,
+            since,
+            cursor=request.args.get('cursor'),
+            limit=_page_limit(request.args.get('limit'))
+        )
+        return _snapshot_response(page)
+        
+    except KeyError as e:
+        return jsonify({
+            'success': False,
+            'message': e.args[0]
+        }), 404
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@app.route('/similar-students/index', methods=['POST'])
+def index_students():
+    """
+    Load students into the similar-students index
+    
+    Expected input:
+    {
+        "mode": "upsert" | "replace",
+        "student_data": [
+            {
+                "student_id": int,
+                "attendance_percentage": float,
+                "average_score": float,
+                "skill_level": str
+            }
+        ]
+    }
+    """
+    try:
+        data = request.get_json()
+        student_data = data.get('student_data')
+        mode = data.get('mode', 'upsert')
+        
+        if not student_data:
+            return jsonify({
+                'success': False,
+                'message': 'student_data is required'
+            }), 400
+        
+        if mode not in ('upsert', 'replace'):
+            return jsonify({
+                'success': False,
+                'message': "mode must be 'upsert' or 'replace'"
+            }), 400
+        
+        if any(student.get('student_id') is None for student in student_data):
+            return jsonify({
+                'success': False,
+                'message': 'student_id is required for every student'
+            }), 400
+        
+        # Reject loads that would push this school past its memory budget
+        additional = len(student_data) * StudentIndex.BYTES_PER_STUDENT
+        if mode == 'replace':
+            additional -= g.tenant.student_index.memory_usage()
+        if not tenants.fits_budget(g.tenant, additional):
+            return jsonify({
+                'success': False,
+                'message': f'Memory budget exceeded for tenant {g.tenant_id}'
+            }), 413
+        
+        if mode == 'replace':
+            result = g.tenant.student_index.build(student_data)
+        else:
+            result = g.tenant.student_index.upsert(student_data)
+        
+        return jsonify({
+            'success': True,
+            **result
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@app.route('/similar-students', methods=['POST'])
+def similar_students():
+    """
+    Find the students most similar to a given student for peer mentoring
+    
+    Expected input:
+    {
+        "student_id": int,            // an indexed student, or
+        "student_data": {             // features of any student
+            "attendance_percentage": float,
+            "average_score": float,
+            "skill_level": str
+        },
+        "k": int,                     // default 5, or 1000 with a radius
+        "radius": float               // optional, standardized units
+    }
+    """
+    try:
+        data = request.get_json()
+        student_id = data.get('student_id')
+        student_data = data.get('student_data')
+        radius = data.get('radius')
+        # A radius alone could match most of the index; cap it like k
+        k = data.get('k', 5 if radius is None else 1000)
+        
+        if student_id is None and not student_data:
+            return jsonify({
+                'success': False,
+                'message': 'student_id or student_data is required'
+            }), 400
+        
+        if k is not None and (not isinstance(k, int) or not 1 <= k <= 1000):
+            return jsonify({
+                'success': False,
+                'message': 'k must be an integer between 1 and 1000'
+            }), 400
+        
+        if radius is not None and (not isinstance(radius, (int, float)) or radius <= 0):
+            return jsonify({
+                'success': False,
+                'message': 'radius must be a positive number'
+            }), 400
+        
+        try:
+            neighbours = g.tenant.student_index.query(student_id, student_data, k=k, radius=radius)
+        except KeyError:
+            return jsonify({
+                'success': False,
+                'message': f'Student {student_id} is not indexed'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'similar_students': neighbours,
+            'indexed_students': g.tenant.student_index.size()
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@app.route('/allocate-enrollments', methods=['POST'])
+def allocate_enrollments():
+    """
+    Allocate seats in oversubscribed activities across all students at
+    once, maximizing preference rank and recommender fit subject to
+    remaining capacity and schedule clashes
+    
+    Expected input:
+    {
+        "students": [
+            {
+                "student_id": int,
+                "preferences": [int],             // activity ids, most wanted first
+                "enrolled_activity_ids": [int],   // optional; clashing options are skipped
+                "enrollment_history": [...]       // optional; as for /recommend-activity
+            }
+        ],
+        "activities": [
+            {
+                "activity_id": int,
+                "max_students": int,
+                "current_enrolled": int,
+                "category": str,
+                "schedule": [{"day_of_week": str, "start_time": str, "end_time": str}]
+            }
+        ],
+        "max_per_student": int,   // default 1
+        "async": bool             // run as a background job; poll /jobs/<job_id>
+    }
+    """
+    try:
+        data = request.get_json()
+        students = data.get('students')
+        activities = data.get('activities')
+        max_per_student = data.get('max_per_student', 1)
+        error = validate_allocate_enrollments(data)
+        
+        if error:
+            return jsonify({
+                'success': False,
+                'message': error
+            }), 400
+        
+        if data.get('async'):
+            job, deduplicated = jobs.submit(g.tenant_id, 'allocate_enrollments', {
+                'students': students,
+                'activities': activities,
+                'max_per_student': max_per_student
+            })
+            return _job_accepted(job, deduplicated)
+        
+        result = g.tenant.enrollment_allocator.allocate(
+            students, activities,
+            max_per_student=max_per_student,
+            recommender=g.tenant.activity_recommender,
+            store=g.tenant.recommendation_store
+        )
+        
+        return jsonify({
+            'success': True,
+            **result
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@app.route('/allocate-enrollments/update', methods=['POST'])
+def update_enrollment_allocation():
+    """
+    Re-solve the latest allocation incrementally after some students
+    changed their preferences; returns the students whose seats moved.
+    Allocation state is held in memory by the worker process that
+    computed it.
+    
+    Expected input:
+    {
+        "allocation_id": str,
+        "students": [...],               // changed or new students, as above
+        "include_assignments": bool      // default false
+    }
+    """
+    try:
+        data = request.get_json()
+        allocation_id = data.get('allocation_id')
+        students = data.get('students')
+        
+        if not allocation_id or not students:
+            return jsonify({
+                'success': False,
+                'message': 'allocation_id and students are required'
+            }), 400
+        
+        if any(student.get('student_id') is None for student in students):
+            return jsonify({
+                'success': False,
+                'message': 'student_id is required for every student'
+            }), 400
+        
+        try:
+            result = g.tenant.enrollment_allocator.update(
+                allocation_id, students,
+                recommender=g.tenant.activity_recommender,
+                store=g.tenant.recommendation_store
+            )
+        except KeyError as e:
+            return jsonify({
+                'success': False,
+                'message': e.args[0]
+            }), 404
+        
+        if not data.get('include_assignments'):
+            result.pop('assignments')
+        
+        return jsonify({
+            'success': True,
+            **result
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@app.route('/drift', methods=['GET'])
+def drift():
+    """
+    Compare the current window of received input features against the
+    reference snapshot
+    """
+    try:
+        report = g.tenant.drift_monitor.report()
+        
+        return jsonify({
+            'success': True,
+            **report
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@app.route('/drift/reference', methods=['POST'])
+def drift_reference():
+    """
+    Pin the reference snapshot used by /drift
+    
+    Expected input (optional):
+    {
+        "source": "current" | "history"
+    }
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        source = data.get('source', 'current')
+        
+        if source not in ('current', 'history'):
+            return jsonify({
+                'success': False,
+                'message': "source must be 'current' or 'history'"
+            }), 400
+        
+        reference = g.tenant.drift_monitor.set_reference(source)
+        
+        return jsonify({
+            'success': True,
+            'reference': reference
         })
         
     except Exception as e:
@@ -223,6 +1119,132 @@ def cluster_students():
             'message': str(e)
         }), 500
 
+def _job_accepted(job, deduplicated):
+    return jsonify({
+        'success': True,
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'deduplicated': deduplicated,
+        'status_url': f"/jobs/{job['job_id']}",
+        'result_url': f"/jobs/{job['job_id']}/result"
+    }), 202
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    Queue a long-running analytics job. Identical submissions return the
+    existing job until its result expires.
+    
+    Expected input:
+    {
+        "type": "cluster_students" | "score_dropout" | "precompute_recommendations"
+                | "allocate_enrollments",
+        "payload": {...}    // the body the synchronous endpoint would take
+    }
+    """
+    try:
+        data = request.get_json()
+        job_type = data.get('type')
+        payload = data.get('payload')
+        
+        if job_type not in JOB_TYPES:
+            return jsonify({
+                'success': False,
+                'message': f"type must be one of {', '.join(sorted(JOB_TYPES))}"
+            }), 400
+        
+        if not isinstance(payload, dict):
+            return jsonify({
+                'success': False,
+                'message': 'payload is required'
+            }), 400
+        
+        # The same checks the synchronous endpoint makes
+        error = JOB_TYPES[job_type][1](payload)
+        if error:
+            return jsonify({
+                'success': False,
+                'message': f"payload: {error}"
+            }), 400
+        
+        job, deduplicated = jobs.submit(g.tenant_id, job_type, payload)
+        return _job_accepted(job, deduplicated)
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Status and progress of a job"""
+    try:
+        job = jobs.status(g.tenant_id, job_id)
+        if job is None:
+            return jsonify({
+                'success': False,
+                'message': f"Job {job_id} not found"
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            **job
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """
+    Result of a finished job; 202 while it is still queued or running
+    """
+    try:
+        job, result = jobs.result(g.tenant_id, job_id)
+        if job is None:
+            return jsonify({
+                'success': False,
+                'message': f"Job {job_id} not found"
+            }), 404
+        
+        if job['status'] == 'failed':
+            return jsonify({
+                'success': False,
+                'job_id': job_id,
+                'status': job['status'],
+                'message': job['error']
+            }), 500
+        
+        if job['status'] != 'succeeded':
+            return jsonify({
+                'success': True,
+                'job_id': job_id,
+                'status': job['status'],
+                'progress': job['progress']
+            }), 202
+        
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status': job['status'],
+            'result': result
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Per-tenant request and resource metrics in the Prometheus text format"""
+    return tenant_metrics.render(tenants), 200, {'Content-Type': 'text/plain; version=0.0.4'}
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({
@@ -0,0 +1,93 @@
+"""
+Compare the fused NumPy kernels against the scikit-learn estimators they
+are compiled from: numerical agreement, single-row and batch latency, and
+import time.
+
+Usage (from ai-service/):
+    python -m benchmarks.benchmark_kernels
+"""
+import subprocess
+import sys
+import time
+
+import numpy as np
+from sklearn.cluster import KMeans
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from services.kernels import LogisticKernel, NearestCentroidKernel
+
+
+def per_call(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def report(label, sklearn_seconds, kernel_seconds):
+    print(f"{label:<30} sklearn {sklearn_seconds * 1e6:10.1f} us   "
+          f"kernel {kernel_seconds * 1e6:10.1f} us   x{sklearn_seconds / kernel_seconds:6.1f}")
+
+
+def import_time(statement):
+    code = f"import time; t = time.perf_counter(); {statement}; print(time.perf_counter() - t)"
+    return float(subprocess.check_output([sys.executable, '-c', code], text=True))
+
+
+def main():
+    rng = np.random.default_rng(42)
+
+    # Dropout model: [attendance, score, sessions, days]
+    X = np.column_stack((
+        rng.uniform(0, 100, 5000), rng.uniform(0, 100, 5000),
+        rng.integers(0, 40, 5000), rng.integers(0, 365, 5000)
+    )).astype(float)
+    y = ((X[:, 0] + X[:, 1]) / 2 + rng.normal(0, 10, 5000) < 60).astype(int)
+    scaler = StandardScaler().fit(X)
+    model = LogisticRegression().fit(scaler.transform(X), y)
+    kernel = LogisticKernel.from_sklearn(scaler, model)
+
+    batch = np.column_stack((
+        rng.uniform(0, 100, 10000), rng.uniform(0, 100, 10000),
+        rng.integers(0, 40, 10000), rng.integers(0, 365, 10000)
+    )).astype(float)
+    expected = model.predict_proba(scaler.transform(batch))
+    print(f"logistic max |diff|: {np.max(np.abs(kernel.predict_proba(batch) - expected)):.2e}")
+
+    row = batch[:1]
+    report('logistic, 1 row',
+           per_call(lambda: model.predict_proba(scaler.transform(row)), 2000),
+           per_call(lambda: kernel.predict_proba(row), 2000))
+    report('logistic, 10k rows',
+           per_call(lambda: model.predict_proba(scaler.transform(batch)), 50),
+           per_call(lambda: kernel.predict_proba(batch), 50))
+
+    # Clustering: [attendance, score, skill]
+    C = np.column_stack((rng.uniform(0, 100, 5000), rng.uniform(0, 100, 5000), rng.integers(1, 5, 5000)))
+    cluster_scaler = StandardScaler().fit(C)
+    kmeans = KMeans(n_clusters=3, random_state=42, n_init=10).fit(cluster_scaler.transform(C))
+    centroid_kernel = NearestCentroidKernel.compile(
+        cluster_scaler.mean_, cluster_scaler.scale_, kmeans.cluster_centers_
+    )
+
+    cluster_batch = np.column_stack((rng.uniform(0, 100, 10000), rng.uniform(0, 100, 10000), rng.integers(1, 5, 10000)))
+    agreement = np.mean(
+        centroid_kernel.predict(cluster_batch) == kmeans.predict(cluster_scaler.transform(cluster_batch))
+    )
+    print(f"nearest-centroid agreement: {agreement:.6f}")
+
+    cluster_row = cluster_batch[:1]
+    report('nearest-centroid, 1 row',
+           per_call(lambda: kmeans.predict(cluster_scaler.transform(cluster_row)), 2000),
+           per_call(lambda: centroid_kernel.predict(cluster_row), 2000))
+    report('nearest-centroid, 10k rows',
+           per_call(lambda: kmeans.predict(cluster_scaler.transform(cluster_batch)), 50),
+           per_call(lambda: centroid_kernel.predict(cluster_batch), 50))
+
+    print(f"import sklearn estimators: {import_time('import sklearn.linear_model, sklearn.cluster'):.3f} s")
+    print(f"import services.kernels:   {import_time('import services.kernels'):.3f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark the similar-students index
+
+Usage (from ai-service/):
+    python -m benchmarks.benchmark_student_index [n_students]
+"""
+import sys
+import time
+
+import numpy as np
+
+from services.student_index import StudentIndex
+
+SKILLS = ['beginner', 'intermediate', 'advanced', 'expert']
+
+
+def make_students(n, rng, start=0):
+    attendance = rng.uniform(0, 100, n)
+    score = rng.normal(65, 15, n).clip(0, 100)
+    skill = rng.integers(0, len(SKILLS), n)
+    return [
+        {
+            'student_id': start + i,
+            'attendance_percentage': float(attendance[i]),
+            'average_score': float(score[i]),
+            'skill_level': SKILLS[skill[i]]
+        }
+        for i in range(n)
+    ]
+
+
+def timed(label, fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = (time.perf_counter() - start) / repeat
+    unit, scale = ('ms', 1e3) if elapsed >= 1e-3 else ('us', 1e6)
+    print(f"{label:<32} {elapsed * scale:10.2f} {unit}")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(42)
+    students = make_students(n, rng)
+    index = StudentIndex()
+
+    print(f"Students: {n:,}")
+    timed('build', lambda: index.build(students))
+
+    query_ids = rng.integers(0, n, 1000).tolist()
+    ids = iter(query_ids * 2)
+    timed('k-NN query (k=10)', lambda: index.query(next(ids), k=10), repeat=1000)
+    ids = iter(query_ids)
+    timed('radius query (r=0.05)', lambda: index.query(next(ids), k=None, radius=0.05), repeat=1000)
+
+    updates = iter(make_students(1000, rng, start=n // 2))
+    timed('upsert (single student)', lambda: index.upsert([next(updates)]), repeat=1000)
+    ids = iter(query_ids)
+    timed('k-NN query with 1k buffered', lambda: index.query(next(ids), k=10), repeat=1000)
+
+    timed('full rebuild', lambda: index.rebuild(wait=True))
+
+
+if __name__ == '__main__':
+    main()
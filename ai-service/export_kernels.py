@@ -0,0 +1,24 @@
+"""
+Compile the fitted dropout model into a fused NumPy kernel (.npz)
+
+Run after retraining, before deploying:
+    python export_kernels.py
+
+The service then loads models/dropout_kernel.npz at startup and serves
+predictions without importing scikit-learn. The clustering reference kernel
+is exported by /cluster-students with "save_reference": true.
+"""
+import sys
+
+from services.dropout_predictor import DropoutPredictor
+
+
+if __name__ == '__main__':
+    predictor = DropoutPredictor()
+    if predictor.kernel is None:
+        print(f"Error: could not load the dropout model from {predictor.model_dir}")
+        sys.exit(1)
+    if predictor.model is None:
+        print(f"Kernel is already up to date: {predictor.kernel_path}")
+    else:
+        print(f"Exported dropout kernel to {predictor.export_kernel()}")
@@ -0,0 +1,222 @@
+import base64
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+SNAPSHOT_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+def encode_cursor(offset):
+    return base64.urlsafe_b64encode(str(offset).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        offset = int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+    if offset < 0:
+        raise ValueError('Invalid cursor')
+    return offset
+
+
+def paginate(items, cursor, limit):
+    """Slice `items` at an opaque cursor; returns (page, next_cursor)"""
+    offset = decode_cursor(cursor)
+    page = items[offset:offset + limit]
+    next_offset = offset + len(page)
+    return page, (encode_cursor(next_offset) if next_offset < len(items) else None)
+
+
+class _Snapshot:
+    def __init__(self, data, size):
+        self.data = data
+        # Parsed JSON takes several times its serialized size in memory
+        self.size = size * 4
+        self.assignments = {}
+        for cluster_name, members in data['clusters'].items():
+            for student in members:
+                if student.get('student_id') is not None:
+                    self.assignments[student['student_id']] = (cluster_name, student)
+
+    def summary(self):
+        return {
+            'snapshot_id': self.data['snapshot_id'],
+            'created_at': self.data['created_at'],
+            'total_students': self.data['total_students'],
+            'n_clusters': self.data['n_clusters'],
+            'cluster_sizes': {name: len(members) for name, members in self.data['clusters'].items()},
+            'cluster_descriptions': self.data['descriptions']
+        }
+
+
+class ClusterSnapshotStore:
+    """
+    Server-side, immutable snapshots of clustering results.
+
+    Snapshots are written as JSON files so every worker process can serve
+    them, and the most recently used ones are kept parsed in memory, bounded
+    by `cache_size` entries and `max_bytes`. Only the newest `limit`
+    snapshots are retained on disk.
+    """
+
+    def __init__(self, path, limit=50, cache_size=8, max_bytes=None):
+        self.path = path
+        self.limit = limit
+        self.cache_size = cache_size
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._cached_bytes = 0
+
+    def is_ready(self):
+        return True
+
+    def save(self, result):
+        """
+        Store a StudentClusterer.cluster() result
+
+        Returns:
+            dict, the snapshot summary (without members)
+        """
+        try:
+            data = {
+                'snapshot_id': uuid.uuid4().hex,
+                'created_at': time.time(),
+                'total_students': result['total_students'],
+                'n_clusters': result['n_clusters'],
+                'descriptions': result['descriptions'],
+                'clusters': result['clusters']
+            }
+            os.makedirs(self.path, exist_ok=True)
+            target = os.path.join(self.path, f"{data['snapshot_id']}.json")
+            tmp_path = f"{target}.tmp"
+            payload = json.dumps(data, separators=(',', ':'), default=float)
+            with open(tmp_path, 'w') as f:
+                f.write(payload)
+            os.replace(tmp_path, target)
+
+            # Round-trip through JSON so cached and reloaded snapshots agree
+            snapshot = _Snapshot(json.loads(payload), len(payload))
+            self._remember(snapshot)
+            self._prune()
+            return snapshot.summary()
+
+        except Exception as e:
+            raise Exception(f"Snapshot save error: {str(e)}")
+
+    def summary(self, snapshot_id):
+        return self._get(snapshot_id).summary()
+
+    def members(self, snapshot_id, cluster_name, cursor=None, limit=100):
+        """One page of a cluster's members"""
+        snapshot = self._get(snapshot_id)
+        members = snapshot.data['clusters'].get(cluster_name)
+        if members is None:
+            raise KeyError(f"Cluster {cluster_name} not found in snapshot {snapshot_id}")
+        page, next_cursor = paginate(members, cursor, limit)
+        return {
+            'snapshot_id': snapshot_id,
+            'cluster': cluster_name,
+            'total': len(members),
+            'students': page,
+            'next_cursor': next_cursor
+        }
+
+    def delta(self, snapshot_id, since_id, cursor=None, limit=100):
+        """
+        Students whose cluster differs between `since_id` and `snapshot_id`.
+        Students that appear in only one snapshot are reported with a null
+        `from` or `to`.
+        """
+        current = self._get(snapshot_id)
+        previous = self._get(since_id)
+
+        changes = []
+        for student_id, (cluster_name, student) in current.assignments.items():
+            before = previous.assignments.get(student_id)
+            before_name = before[0] if before else None
+            if before_name != cluster_name:
+                changes.append({'student_id': student_id, 'from': before_name, 'to': cluster_name, 'student': student})
+        for student_id, (cluster_name, _) in previous.assignments.items():
+            if student_id not in current.assignments:
+                changes.append({'student_id': student_id, 'from': cluster_name, 'to': None, 'student': None})
+
+        page, next_cursor = paginate(changes, cursor, limit)
+        return {
+            'snapshot_id': snapshot_id,
+            'since_snapshot_id': since_id,
+            'total_changes': len(changes),
+            'changes': page,
+            'next_cursor': next_cursor,
+            'cluster_descriptions': current.data['descriptions']
+        }
+
+    def _get(self, snapshot_id):
+        if not isinstance(snapshot_id, str) or not SNAPSHOT_ID.match(snapshot_id):
+            raise KeyError(f"Snapshot {snapshot_id} not found")
+        with self._lock:
+            snapshot = self._cache.get(snapshot_id)
+            if snapshot is not None:
+                self._cache.move_to_end(snapshot_id)
+                return snapshot
+        try:
+            with open(os.path.join(self.path, f"{snapshot_id}.json")) as f:
+                payload = f.read()
+            snapshot = _Snapshot(json.loads(payload), len(payload))
+        except FileNotFoundError:
+            raise KeyError(f"Snapshot {snapshot_id} not found")
+        self._remember(snapshot)
+        return snapshot
+
+    def memory_usage(self):
+        """Approximate memory held by parsed snapshots, in bytes"""
+        with self._lock:
+            return self._cached_bytes
+
+    def trim(self, max_bytes):
+        """Evict least recently used parsed snapshots down to `max_bytes`"""
+        with self._lock:
+            self._evict(max_bytes)
+
+    def _remember(self, snapshot):
+        with self._lock:
+            previous = self._cache.pop(snapshot.data['snapshot_id'], None)
+            if previous is not None:
+                self._cached_bytes -= previous.size
+            self._cache[snapshot.data['snapshot_id']] = snapshot
+            self._cached_bytes += snapshot.size
+            self._evict(self.max_bytes)
+
+    def _evict(self, max_bytes):
+        """Caller holds the lock; the most recent snapshot is always kept"""
+        while len(self._cache) > 1 and (
+            len(self._cache) > self.cache_size
+            or (max_bytes is not None and self._cached_bytes > max_bytes)
+        ):
+            _, evicted = self._cache.popitem(last=False)
+            self._cached_bytes -= evicted.size
+
+    def _prune(self):
+        """Delete the oldest snapshot files beyond the retention limit"""
+        files = []
+        for name in os.listdir(self.path):
+            if name.endswith('.json') and SNAPSHOT_ID.match(name[:-5]):
+                try:
+                    files.append((os.path.getmtime(os.path.join(self.path, name)), name))
+                except OSError:
+                    # Removed concurrently by another worker
+                    continue
+        files.sort()
+        for _, stale in files[:max(0, len(files) - self.limit)]:
+            try:
+                os.remove(os.path.join(self.path, stale))
+            except OSError:
+                pass
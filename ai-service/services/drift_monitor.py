@@ -0,0 +1,357 @@
+import math
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# Fixed-range histogram layout per monitored feature: (low, high, bins).
+# Values outside the range land in dedicated underflow/overflow buckets, so
+# memory per feature is constant no matter how much traffic we receive.
+FEATURE_SPECS = {
+    'dropout': {
+        'attendance_percentage': (0, 100, 200),
+        'average_score': (0, 100, 200),
+        'total_sessions': (0, 200, 200),
+        'days_enrolled': (0, 730, 146)
+    },
+    'performance': {
+        'score': (0, 100, 200),
+        'evaluation_count': (0, 100, 100)
+    },
+    'recommendation': {
+        'history_length': (0, 50, 50),
+        'avg_score': (0, 100, 200)
+    },
+    'clustering': {
+        'attendance_percentage': (0, 100, 200),
+        'average_score': (0, 100, 200),
+        'skill_level': (0, 5, 5),
+        'batch_size': (0, 10000, 200)
+    }
+}
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+def _to_float(value):
+    """Coerce a raw JSON value to a finite float, or None if it is unusable"""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+class _FeatureSketch:
+    """
+    Constant-memory sketch of a single feature: a fixed-bin histogram plus
+    running count/sum/min/max. Quantiles are interpolated from the histogram,
+    so their error is bounded by one bin width.
+    """
+
+    __slots__ = ('low', 'high', 'bins', 'scale', 'counts', 'underflow',
+                 'overflow', 'count', 'total', 'min', 'max')
+
+    def __init__(self, low, high, bins):
+        self.low = float(low)
+        self.high = float(high)
+        self.bins = int(bins)
+        self.scale = self.bins / (self.high - self.low)
+        self.counts = [0] * self.bins
+        self.underflow = 0
+        self.overflow = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        if value < self.low:
+            self.underflow += 1
+        elif value >= self.high:
+            self.overflow += 1
+        else:
+            self.counts[int((value - self.low) * self.scale)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def add_many(self, values):
+        values = np.asarray(values, dtype=float)
+        if values.size == 0:
+            return
+        below = values < self.low
+        above = values >= self.high
+        inside = values[~(below | above)]
+        idx = ((inside - self.low) * self.scale).astype(int)
+        for i, c in zip(*np.unique(idx, return_counts=True)):
+            self.counts[int(i)] += int(c)
+        self.underflow += int(below.sum())
+        self.overflow += int(above.sum())
+        self.count += int(values.size)
+        self.total += float(values.sum())
+        vmin, vmax = float(values.min()), float(values.max())
+        self.min = vmin if self.min is None else min(self.min, vmin)
+        self.max = vmax if self.max is None else max(self.max, vmax)
+
+    def merge(self, other):
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        if other.max is not None:
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def copy(self):
+        clone = _FeatureSketch(self.low, self.high, self.bins)
+        clone.merge(self)
+        return clone
+
+    def distribution(self, buckets=None):
+        """
+        Probability mass over [underflow, bins..., overflow], optionally
+        coarsened to roughly `buckets` in-range buckets
+        """
+        inner = np.array(self.counts, dtype=float)
+        if buckets and buckets < self.bins:
+            edges = np.linspace(0, self.bins, buckets + 1).astype(int)[:-1]
+            inner = np.add.reduceat(inner, np.unique(edges))
+        mass = np.concatenate(([self.underflow], inner, [self.overflow]))
+        return mass / self.count if self.count else mass
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        target = q * self.count
+        cumulative = self.underflow
+        if cumulative >= target:
+            return self.min
+        width = 1.0 / self.scale
+        for i, c in enumerate(self.counts):
+            if c and cumulative + c >= target:
+                fraction = (target - cumulative) / c
+                value = self.low + (i + fraction) * width
+                return min(max(value, self.min), self.max)
+            cumulative += c
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 4) if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'quantiles': {
+                f"p{int(q * 100)}": (round(v, 4) if v is not None else None)
+                for q, v in ((q, self.quantile(q)) for q in QUANTILES)
+            },
+            'out_of_range': self.underflow + self.overflow
+        }
+
+
+class _Window:
+    """Sketches for every monitored stream over one time window"""
+
+    def __init__(self, started_at):
+        self.started_at = started_at
+        self.ended_at = None
+        self.requests = {stream: 0 for stream in FEATURE_SPECS}
+        self.invalid = {stream: 0 for stream in FEATURE_SPECS}
+        self.sketches = {
+            stream: {name: _FeatureSketch(*spec) for name, spec in features.items()}
+            for stream, features in FEATURE_SPECS.items()
+        }
+
+    def merge(self, other):
+        for stream, features in other.sketches.items():
+            self.requests[stream] += other.requests[stream]
+            self.invalid[stream] += other.invalid[stream]
+            for name, sketch in features.items():
+                self.sketches[stream][name].merge(sketch)
+
+    def copy(self):
+        clone = _Window(self.started_at)
+        clone.ended_at = self.ended_at
+        clone.merge(self)
+        return clone
+
+
+class DriftMonitor:
+    """
+    Records the distribution of input features received by the prediction
+    endpoints in fixed-size streaming sketches, one set per time window, and
+    compares the current window against a pinned reference snapshot.
+    """
+
+    def __init__(self, window_seconds=3600, history=24, psi_threshold=0.2):
+        self.ready = True
+        self.window_seconds = window_seconds
+        self.psi_threshold = psi_threshold
+        self._lock = threading.Lock()
+        self._current = _Window(time.time())
+        self._history = deque(maxlen=history)
+        self._reference = None
+
+    def is_ready(self):
+        return self.ready
+
+    def memory_usage(self):
+        """Approximate memory held by the sketches, in bytes (bounded)"""
+        bins = sum(spec[2] + 12 for features in FEATURE_SPECS.values() for spec in features.values())
+        windows = len(self._history) + 1 + (1 if self._reference else 0)
+        return bins * 8 * windows
+
+    def flush(self):
+        """
+        Rolling windows may be dropped, but a pinned reference cannot be
+        rebuilt once lost
+        """
+        return self._reference is None
+
+    def observe(self, stream, features):
+        """
+        Record one request's input features
+
+        Args:
+            stream: str, one of FEATURE_SPECS
+            features: dict of feature name -> numeric value or list of values
+        """
+        specs = FEATURE_SPECS.get(stream)
+        if specs is None:
+            return
+
+        # Convert outside the lock so the critical section stays tiny
+        scalars = []
+        batches = []
+        invalid = 0
+        for name, value in features.items():
+            if name not in specs:
+                continue
+            if isinstance(value, (list, tuple)):
+                batch = [v for v in map(_to_float, value) if v is not None]
+                invalid += len(value) - len(batch)
+                batches.append((name, batch))
+            else:
+                value = _to_float(value)
+                if value is None:
+                    invalid += 1
+                else:
+                    scalars.append((name, value))
+
+        with self._lock:
+            window = self._rotate(time.time())
+            window.requests[stream] += 1
+            window.invalid[stream] += invalid
+            sketches = window.sketches[stream]
+            for name, value in scalars:
+                sketches[name].add(value)
+            for name, batch in batches:
+                sketches[name].add_many(batch)
+
+    def set_reference(self, source='current'):
+        """
+        Pin the reference snapshot
+
+        Args:
+            source: 'current' to pin the current window, or 'history' to pin
+                the current window merged with all retained windows
+        """
+        with self._lock:
+            now = time.time()
+            window = self._rotate(now)
+            if source == 'history':
+                reference = _Window(self._history[0].started_at if self._history else window.started_at)
+                for past in self._history:
+                    reference.merge(past)
+                reference.merge(window)
+            elif source == 'current':
+                reference = window.copy()
+            else:
+                raise ValueError(f"Unknown reference source: {source}")
+            reference.ended_at = now
+            self._reference = reference
+            # Start a fresh window so the comparison does not overlap the reference
+            self._rotate(now, force=True)
+            return self._describe_window(reference)
+
+    def report(self):
+        """Compare the current window against the reference snapshot"""
+        try:
+            with self._lock:
+                now = time.time()
+                current = self._rotate(now).copy()
+                reference = self._reference.copy() if self._reference else None
+                if reference is None and self._history:
+                    # Fall back to the most recent completed window
+                    reference = self._history[-1].copy()
+
+            streams = {}
+            drifted = []
+            for stream, features in current.sketches.items():
+                stream_report = {}
+                for name, sketch in features.items():
+                    entry = {'current': sketch.summary()}
+                    if reference is not None:
+                        ref_sketch = reference.sketches[stream][name]
+                        entry['reference'] = ref_sketch.summary()
+                        if sketch.count and ref_sketch.count:
+                            psi = self._psi(ref_sketch, sketch)
+                            entry['psi'] = round(psi, 4)
+                            entry['ks_statistic'] = round(self._ks(ref_sketch, sketch), 4)
+                            entry['drifted'] = psi >= self.psi_threshold
+                            if entry['drifted']:
+                                drifted.append(f"{stream}.{name}")
+                    stream_report[name] = entry
+                streams[stream] = {
+                    'requests': current.requests[stream],
+                    'invalid_values': current.invalid[stream],
+                    'features': stream_report
+                }
+
+            return {
+                'window': self._describe_window(current, now),
+                'reference': self._describe_window(reference) if reference else None,
+                'psi_threshold': self.psi_threshold,
+                'drifted_features': drifted,
+                'streams': streams
+            }
+
+        except Exception as e:
+            raise Exception(f"Drift report error: {str(e)}")
+
+    def _rotate(self, now, force=False):
+        """Close the current window if it has expired; caller holds the lock"""
+        if force or now - self._current.started_at >= self.window_seconds:
+            self._current.ended_at = now
+            self._history.append(self._current)
+            self._current = _Window(now)
+        return self._current
+
+    def _describe_window(self, window, now=None):
+        return {
+            'started_at': window.started_at,
+            'ended_at': window.ended_at if window.ended_at is not None else now,
+            'requests': sum(window.requests.values())
+        }
+
+    @staticmethod
+    def _psi(reference, current, buckets=10, epsilon=1e-4):
+        """Population stability index between two sketches of the same feature"""
+        expected = np.clip(reference.distribution(buckets), epsilon, None)
+        actual = np.clip(current.distribution(buckets), epsilon, None)
+        return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+    @staticmethod
+    def _ks(reference, current):
+        """Kolmogorov-Smirnov statistic evaluated on the shared bin edges"""
+        return float(np.max(np.abs(
+            np.cumsum(reference.distribution()) - np.cumsum(current.distribution())
+        )))
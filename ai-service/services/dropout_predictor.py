@@ -1,43 +1,130 @@
 import numpy as np
-from sklearn.linear_model import LogisticRegression
-from sklearn.preprocessing import StandardScaler
-import joblib
 import os
+from services.kernels import LogisticKernel
 
 class DropoutPredictor:
     """
     Predicts student dropout risk using Logistic Regression
+    
+    Serving uses a fused NumPy kernel (scaling + logistic regression in one
+    operation). scikit-learn is only imported when the kernel has to be
+    compiled from the pickled model or a fresh model has to be fitted.
     """
     
-    def __init__(self):
+    SHARED_NAME = 'dropout_model'
+    
+    def __init__(self, shared_cache=None, model_dir='models'):
         self.model = None
-        self.scaler = StandardScaler()
-        self.model_path = os.path.join('models', 'dropout_model.pkl')
-        self.scaler_path = os.path.join('models', 'dropout_scaler.pkl')
+        self.scaler = None
+        self.kernel = None
+        self.model_dir = model_dir
+        self.model_path = os.path.join(model_dir, 'dropout_model.pkl')
+        self.scaler_path = os.path.join(model_dir, 'dropout_scaler.pkl')
+        self.kernel_path = os.path.join(model_dir, 'dropout_kernel.npz')
+        self.shared_cache = shared_cache
+        self.shared_version = None
         self._load_or_create_model()
+        self._sync_shared(publish_if_stale=True)
     
     def _load_or_create_model(self):
-        """Load existing model or create new one"""
+        """Load the exported kernel, or the pickled model, or create a new one"""
         try:
+            if self._kernel_is_current():
+                self.kernel = LogisticKernel.load(self.kernel_path)
+                return
+            
+            import joblib
+            from sklearn.linear_model import LogisticRegression
+            from sklearn.preprocessing import StandardScaler
+            
             if os.path.exists(self.model_path) and os.path.exists(self.scaler_path):
                 self.model = joblib.load(self.model_path)
                 self.scaler = joblib.load(self.scaler_path)
             else:
                 # Create a simple model with default parameters
                 self.model = LogisticRegression(random_state=42)
+                self.scaler = StandardScaler()
                 # Train with dummy data for initialization
                 X_dummy = np.array([[80, 75, 10, 30], [60, 50, 5, 20], [90, 85, 15, 40]])
                 y_dummy = np.array([0, 1, 0])  # 0: low risk, 1: high risk
                 self.scaler.fit(X_dummy)
                 X_scaled = self.scaler.transform(X_dummy)
                 self.model.fit(X_scaled, y_dummy)
+            self.kernel = LogisticKernel.from_sklearn(self.scaler, self.model)
         except Exception as e:
             print(f"Error loading model: {e}")
-            self.model = LogisticRegression(random_state=42)
+    
+    def _kernel_is_current(self):
+        """An exported kernel is used unless the pickled model is newer"""
+        if not os.path.exists(self.kernel_path):
+            return False
+        kernel_mtime = os.path.getmtime(self.kernel_path)
+        return all(
+            not os.path.exists(path) or os.path.getmtime(path) <= kernel_mtime
+            for path in (self.model_path, self.scaler_path)
+        )
     
     def is_ready(self):
         """Check if model is ready"""
-        return self.model is not None
+        return self.kernel is not None
+    
+    def model_arrays(self):
+        """Fused kernel parameters as plain arrays"""
+        return self.kernel.arrays()
+    
+    def export_kernel(self, path=None):
+        """Compile the fitted model into a fused kernel saved as .npz"""
+        path = path or self.kernel_path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if self.model is not None:
+            self.kernel = LogisticKernel.from_sklearn(self.scaler, self.model)
+        if self.kernel is None:
+            raise Exception("No fitted dropout model to export")
+        self.kernel.save(path)
+        return path
+    
+    def predict_proba(self, features):
+        """
+        Model dropout probability for one or more rows of
+        [attendance_percentage, average_score, total_sessions, days_enrolled]
+        """
+        proba = self.kernel.predict_proba(features)
+        return proba[:, list(self.kernel.classes).index(1)]
+    
+    def publish_shared(self):
+        """Publish the current kernel for every worker on this host"""
+        return self.shared_cache.publish(self.SHARED_NAME, self.model_arrays())
+    
+    def _sync_shared(self, publish_if_stale=False):
+        """
+        Point the kernel at the host-wide shared arrays, picking up newly
+        published versions. Costs a single small file read when nothing has
+        changed.
+        
+        With publish_if_stale (used at startup), the locally loaded parameters
+        are published first unless the shared ones are identical, so a
+        redeployed model replaces whatever a previous release left behind.
+        """
+        if self.shared_cache is None:
+            return
+        try:
+            entry = self.shared_cache.attach(self.SHARED_NAME)
+            if publish_if_stale and self.kernel is not None:
+                local = self.model_arrays()
+                if entry is None or any(
+                    key not in entry.arrays or not np.array_equal(entry[key], value)
+                    for key, value in local.items()
+                ):
+                    self.publish_shared()
+                    entry = self.shared_cache.attach(self.SHARED_NAME)
+            if entry is None or entry.version == self.shared_version:
+                return
+            
+            # Serve straight from the read-only mappings (zero-copy)
+            self.kernel = LogisticKernel.from_arrays(entry.arrays)
+            self.shared_version = entry.version
+        except Exception as e:
+            print(f"Error attaching shared dropout model: {e}")
     
     def predict(self, student_data):
         """
@@ -54,6 +141,8 @@ class DropoutPredictor:
             dict with prediction results
         """
         try:
+            self._sync_shared()
+            
             # Extract features
             attendance = student_data.get('attendance_percentage', 0)
             score = student_data.get('average_score', 0)
@@ -105,12 +194,21 @@ class DropoutPredictor:
                 risk_level = 'low'
                 recommended_actions = 'Continue current engagement level. Maintain regular monitoring and positive reinforcement.'
             
+            # Logistic model probability from the fused kernel, alongside the rules
+            model_probability = None
+            try:
+                features = [float(value or 0) for value in (attendance, score, sessions, days)]
+                model_probability = round(float(self.predict_proba(features)[0]), 4)
+            except (TypeError, ValueError, AttributeError):
+                pass
+            
             return {
                 'prediction': {
                     'risk_score': round(risk_score, 4),
                     'attendance_percentage': attendance,
                     'average_score': score,
-                    'total_sessions': sessions
+                    'total_sessions': sessions,
+                    'model_probability': model_probability
                 },
                 'confidence': round(1 - abs(0.5 - risk_score), 4),
                 'risk_level': risk_level,
@@ -122,10 +220,19 @@ class DropoutPredictor:
             raise Exception(f"Prediction error: {str(e)}")
     
     def save_model(self):
-        """Save model to disk"""
+        """Save model and its exported kernel to disk"""
         try:
-            os.makedirs('models', exist_ok=True)
-            joblib.dump(self.model, self.model_path)
-            joblib.dump(self.scaler, self.scaler_path)
+            import joblib
+            
+            os.makedirs(self.model_dir, exist_ok=True)
+            # Served from the exported kernel alone, the pickles on disk are
+            # the model; don't overwrite them with None
+            if self.model is not None:
+                joblib.dump(self.model, self.model_path)
+                joblib.dump(self.scaler, self.scaler_path)
+            self.export_kernel()
+            if self.shared_cache is not None:
+                self.publish_shared()
+                self._sync_shared()
         except Exception as e:
             print(f"Error saving model: {e}")
\ No newline at end of file
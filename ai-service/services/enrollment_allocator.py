@@ -0,0 +1,608 @@
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from services.recommendation_store import history_digest
+
+DAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+
+def _minutes(value):
+    """'HH:MM' or 'HH:MM:SS' to minutes since midnight"""
+    parts = str(value).split(':')
+    return int(parts[0]) * 60 + int(parts[1])
+
+
+def clash_matrix(activities):
+    """
+    Boolean (n_activities, n_activities) matrix, True where two activities
+    have overlapping sessions on the same day
+    """
+    rows, days, starts, ends = [], [], [], []
+    for i, activity in enumerate(activities):
+        for session in activity.get('schedule') or []:
+            rows.append(i)
+            days.append(DAYS.index(str(session['day_of_week']).lower()))
+            starts.append(_minutes(session['start_time']))
+            ends.append(_minutes(session['end_time']))
+    n = len(activities)
+    if not rows:
+        return np.zeros((n, n), dtype=bool)
+    days, starts, ends = np.array(days), np.array(starts), np.array(ends)
+    overlap = (
+        (days[:, None] == days[None, :])
+        & (starts[:, None] < ends[None, :])
+        & (starts[None, :] < ends[:, None])
+    ).astype(np.float32)
+    membership = np.zeros((n, len(rows)), dtype=np.float32)
+    membership[rows, np.arange(len(rows))] = 1
+    return (membership @ overlap @ membership.T) > 0
+
+
+class _Round:
+    """
+    One capacity-constrained assignment (each student gets at most one
+    activity) solved with a Jacobi auction.
+
+    Every seat of an activity is priced by the bid of the student holding
+    it; a full activity costs its lowest seat price and one with free seats
+    costs nothing. Unassigned students bid for their best net value
+    (fit - price), outbidding the lowest seat, until every student holds a
+    seat within epsilon of their best option or prefers no seat. Bidding
+    happens for all active students at once on flat arrays.
+
+    Prices never fall while bidding. When a warm-started student gives up
+    a seat, the seat keeps its price as a "phantom" holder so that nobody
+    else's prices drop; a final reverse auction then hands each phantom
+    seat to the student who gains most from it, or frees it at price zero.
+    """
+
+    def __init__(self, indptr, cols, vals, capacity):
+        self.indptr = indptr
+        self.cols = cols
+        self.vals = vals
+        self.capacity = capacity
+        n = len(indptr) - 1
+        self.degree = np.diff(indptr)
+        self.owner = np.full(n, -1, dtype=np.int64)
+        self.bid = np.zeros(n)
+        self.value = np.zeros(n)
+        self.price = np.zeros(len(capacity))
+        self.phantom_activity = np.zeros(0, dtype=np.int64)
+        self.phantom_bid = np.zeros(0)
+        self.iterations = 0
+
+    def seed(self, owner, bid):
+        """Warm start from a previous solution"""
+        student_of_edge = np.repeat(np.arange(len(owner)), self.degree)
+        hit = np.flatnonzero(self.cols == owner[student_of_edge])
+        students = student_of_edge[hit]
+        self.owner[students] = owner[students]
+        self.bid[students] = bid[students]
+        self.value[students] = self.vals[hit]
+        # Seats of students who no longer want them keep their price
+        gone = (owner >= 0) & (self.owner < 0)
+        self._vacate(owner[gone], bid[gone])
+
+        # Drop the cheapest holders of activities that lost capacity
+        held = np.flatnonzero(self.owner >= 0)
+        n_phantoms = len(self.phantom_activity)
+        seat_activity = np.concatenate((self.owner[held], self.phantom_activity))
+        seat_bid = np.concatenate((self.bid[held], self.phantom_bid))
+        order = np.lexsort((-seat_bid, seat_activity))
+        keep = np.zeros(len(order), dtype=bool)
+        keep[order] = _rank_in_groups(seat_activity[order]) < self.capacity[seat_activity[order]]
+        self.owner[held[~keep[:len(held)]]] = -1
+        phantom_keep = keep[len(held):len(held) + n_phantoms]
+        self.phantom_activity = self.phantom_activity[phantom_keep]
+        self.phantom_bid = self.phantom_bid[phantom_keep]
+
+    def solve(self, eps, max_iterations=100000):
+        while True:
+            active = self._repair(eps)
+            while active.size:
+                self.iterations += 1
+                if self.iterations > max_iterations:
+                    raise Exception("Allocation did not converge")
+                active = self._bid(active, eps)
+            if not len(self.phantom_activity):
+                return self.owner
+            self._release(eps, max_iterations)
+
+    def _vacate(self, activity, bid):
+        self.phantom_activity = np.concatenate((self.phantom_activity, activity))
+        self.phantom_bid = np.concatenate((self.phantom_bid, bid))
+
+    def _prices(self):
+        held = np.flatnonzero(self.owner >= 0)
+        seat_activity = np.concatenate((self.owner[held], self.phantom_activity))
+        seat_bid = np.concatenate((self.bid[held], self.phantom_bid))
+        counts = np.bincount(seat_activity, minlength=len(self.capacity))
+        lowest = np.full(len(self.capacity), np.inf)
+        np.minimum.at(lowest, seat_activity, seat_bid)
+        self.price = np.where(counts >= self.capacity, lowest, 0.0)
+
+    def _net_alternatives(self):
+        """Each student's best net value outside their own activity, floored at 0"""
+        n = len(self.owner)
+        best_other = np.zeros(n)
+        students = np.flatnonzero(self.degree > 0)
+        if not students.size:
+            return best_other
+        net = self.vals - self.price[self.cols]
+        student_of_edge = np.repeat(np.arange(n), self.degree)
+        net[self.cols == self.owner[student_of_edge]] = -np.inf
+        best_other[students] = np.maximum(np.maximum.reduceat(net, self.indptr[students]), 0.0)
+        return best_other
+
+    def _repair(self, eps):
+        """
+        Release holders whose seat is no longer within eps of their best
+        option (their values changed since the warm start), and return
+        every student who should bid
+        """
+        self._prices()
+        best_other = self._net_alternatives()
+        held = self.owner >= 0
+        violators = np.flatnonzero(held & (self.value - self.bid < best_other - eps - 1e-12))
+        self._vacate(self.owner[violators], self.bid[violators])
+        self.owner[violators] = -1
+        return np.flatnonzero((self.owner < 0) & (best_other > 0))
+
+    def _bid(self, active, eps):
+        starts = self.indptr[active]
+        lengths = self.degree[active]
+        offsets = np.cumsum(lengths) - lengths
+        edges = np.arange(lengths.sum()) - np.repeat(offsets, lengths) + np.repeat(starts, lengths)
+        segment = np.repeat(np.arange(len(active)), lengths)
+
+        net = self.vals[edges] - self.price[self.cols[edges]]
+        best = np.maximum.reduceat(net, offsets)
+        is_best = np.flatnonzero(net == best[segment])
+        _, first = np.unique(segment[is_best], return_index=True)
+        best_edge = is_best[first]
+        net[best_edge] = -np.inf
+        second = np.maximum(np.maximum.reduceat(net, offsets), 0.0)
+
+        # Students whose best option is worth no more than staying out retire
+        bidding = best > 0
+        bidders = active[bidding]
+        chosen = edges[best_edge[bidding]]
+        activity = self.cols[chosen]
+        amount = self.vals[chosen] - second[bidding] + eps
+
+        touched = np.zeros(len(self.capacity), dtype=bool)
+        touched[activity] = True
+        holders = np.flatnonzero(self.owner >= 0)
+        holders = holders[touched[self.owner[holders]]]
+        phantoms = touched[self.phantom_activity]
+
+        # Seats of the touched activities go to the highest bids; phantom
+        # seats are marked with candidate id -1
+        candidates = np.concatenate((holders, np.full(phantoms.sum(), -1), bidders))
+        candidate_activity = np.concatenate((self.owner[holders], self.phantom_activity[phantoms], activity))
+        candidate_bid = np.concatenate((self.bid[holders], self.phantom_bid[phantoms], amount))
+        candidate_value = np.concatenate((self.value[holders], np.zeros(phantoms.sum()), self.vals[chosen]))
+        order = np.lexsort((-candidate_bid, candidate_activity))
+        candidates = candidates[order]
+        candidate_activity = candidate_activity[order]
+        candidate_bid = candidate_bid[order]
+        keep = _rank_in_groups(candidate_activity) < self.capacity[candidate_activity]
+
+        students = candidates >= 0
+        winners = candidates[keep & students]
+        losers = candidates[~keep & students]
+        self.owner[losers] = -1
+        self.owner[winners] = candidate_activity[keep & students]
+        self.bid[winners] = candidate_bid[keep & students]
+        self.value[winners] = candidate_value[order][keep & students]
+        kept_phantoms = keep & ~students
+        self.phantom_activity = np.concatenate((
+            self.phantom_activity[~phantoms], candidate_activity[kept_phantoms]
+        ))
+        self.phantom_bid = np.concatenate((self.phantom_bid[~phantoms], candidate_bid[kept_phantoms]))
+
+        # Prices only rise while bidding; refresh the touched activities
+        kept_activity = candidate_activity[keep]
+        counts = np.bincount(kept_activity, minlength=len(self.capacity))
+        lowest = np.full(len(self.capacity), np.inf)
+        np.minimum.at(lowest, kept_activity, candidate_bid[keep])
+        touched_ids = np.flatnonzero(touched)
+        self.price[touched_ids] = np.where(
+            counts[touched_ids] >= self.capacity[touched_ids], lowest[touched_ids], 0.0
+        )
+        return losers
+
+    def _release(self, eps, max_steps):
+        """
+        Reverse auction over phantom seats: each seat goes to the student
+        gaining most from it, at a price that keeps everyone else within
+        eps, or is freed at price zero when nobody gains. A student moving
+        into a phantom seat leaves a phantom at their old seat.
+        """
+        n = len(self.owner)
+        student_of_edge = np.repeat(np.arange(n), self.degree)
+        by_activity = np.argsort(self.cols, kind='stable')
+        activity_ptr = np.zeros(len(self.capacity) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.cols, minlength=len(self.capacity)), out=activity_ptr[1:])
+
+        pending = list(zip(self.phantom_activity.tolist(), self.phantom_bid.tolist()))
+        self.phantom_activity = np.zeros(0, dtype=np.int64)
+        self.phantom_bid = np.zeros(0)
+        steps = 0
+        while pending:
+            steps += 1
+            if steps > max_steps:
+                raise Exception("Allocation did not converge")
+            j, _ = pending.pop()
+            edges = by_activity[activity_ptr[j]:activity_ptr[j + 1]]
+            students = student_of_edge[edges]
+            owner = self.owner[students]
+            surplus = np.where(owner >= 0, self.value[students] - self.bid[students], 0.0)
+            gain = self.vals[edges] - surplus
+            gain[owner == j] = -np.inf
+            if not gain.size:
+                continue
+            k = int(np.argmax(gain))
+            if gain[k] <= 0:
+                continue
+            gain[k] = -np.inf
+            second = max(float(gain.max()) if gain.size > 1 else 0.0, 0.0)
+            student = students[k]
+            if self.owner[student] >= 0:
+                pending.append((int(self.owner[student]), float(self.bid[student])))
+            self.owner[student] = j
+            self.bid[student] = max(second - eps, 0.0)
+            self.value[student] = self.vals[edges[k]]
+
+
+def _rank_in_groups(sorted_groups):
+    """0-based position of each element within its run of equal values"""
+    n = len(sorted_groups)
+    if not n:
+        return np.zeros(0, dtype=np.int64)
+    boundary = np.ones(n, dtype=bool)
+    boundary[1:] = sorted_groups[1:] != sorted_groups[:-1]
+    group_start = np.maximum.accumulate(np.where(boundary, np.arange(n), 0))
+    return np.arange(n) - group_start
+
+
+class EnrollmentAllocator:
+    """
+    Allocates students to oversubscribed activities globally.
+
+    Each student's ranked preferences are scored by preference rank and by
+    the recommender's predicted fit for the activity's category, and seats
+    are assigned to maximize the total score subject to remaining capacity
+    (max_students - current_enrolled) and schedule clashes with the
+    activities a student is already enrolled in. With max_per_student > 1,
+    students receive one activity per round and options that clash with an
+    earlier pick are removed before the next round.
+
+    The last allocation is kept so that changed preferences can be
+    re-solved incrementally, warm-started from the previous seats and
+    prices instead of from scratch.
+    """
+
+    def __init__(self, eps=0.001, rank_weight=1.0, fit_weight=0.5):
+        self.ready = True
+        self.eps = eps
+        self.rank_weight = rank_weight
+        self.fit_weight = fit_weight
+        self._lock = threading.Lock()
+        self._last = None
+
+    def is_ready(self):
+        return self.ready
+
+    def allocate(self, students, activities, max_per_student=1, recommender=None, store=None):
+        """
+        Compute a global allocation
+
+        Args:
+            students: list of dicts with keys:
+                - student_id: int
+                - preferences: list of activity_id, most wanted first
+                - enrolled_activity_ids: list of int (optional)
+                - enrollment_history: list (optional, for recommender fit)
+            activities: list of dicts with keys:
+                - activity_id: int
+                - max_students: int
+                - current_enrolled: int
+                - category: str
+                - schedule: list of {day_of_week, start_time, end_time}
+            max_per_student: int, seats per student
+            recommender: ActivityRecommender used for fit scores
+            store: RecommendationStore consulted before the recommender
+
+        Returns:
+            dict with the allocation
+        """
+        try:
+            with self._lock:
+                problem = {
+                    'students': {s['student_id']: s for s in students},
+                    'activities': activities,
+                    'max_per_student': max_per_student,
+                    'fit_cache': {'students': {}, 'histories': {}}
+                }
+                return self._solve(problem, None, recommender, store)
+
+        except Exception as e:
+            raise Exception(f"Allocation error: {str(e)}")
+
+    def update(self, allocation_id, students, recommender=None, store=None):
+        """
+        Re-solve the last allocation after some students changed their
+        preferences (or joined); unchanged students keep their warm state
+
+        Raises:
+            KeyError: if allocation_id is not the latest allocation
+        """
+        with self._lock:
+            if self._last is None or self._last['allocation_id'] != allocation_id:
+                raise KeyError(f"Allocation {allocation_id} not found")
+            try:
+                problem = dict(self._last['problem'])
+                problem['students'] = dict(problem['students'])
+                for student in students:
+                    problem['students'][student['student_id']] = student
+                    problem['fit_cache']['students'].pop(student['student_id'], None)
+                return self._solve(problem, self._last, recommender, store)
+
+            except Exception as e:
+                raise Exception(f"Allocation update error: {str(e)}")
+
+    def flush(self):
+        """The last allocation only lives in memory and cannot be persisted"""
+        return self._last is None
+
+    def memory_usage(self):
+        """Approximate bytes held by the last allocation"""
+        last = self._last
+        if last is None:
+            return 0
+        per_student = 400 + 16 * last['problem']['max_per_student']
+        return len(last['problem']['students']) * per_student
+
+    def _solve(self, problem, previous, recommender, store):
+        started = time.perf_counter()
+        activities = problem['activities']
+        activity_ids = [a['activity_id'] for a in activities]
+        position = {activity_id: i for i, activity_id in enumerate(activity_ids)}
+        capacity = np.array([
+            max(0, int(a.get('max_students') or 0) - int(a.get('current_enrolled') or 0))
+            for a in activities
+        ], dtype=np.int64)
+        clashes = clash_matrix(activities)
+        categories = [a.get('category') for a in activities]
+
+        student_ids = list(problem['students'])
+        indptr, cols, vals, ranks = self._edges(
+            problem, student_ids, position, categories, recommender, store
+        )
+        cols, vals, ranks, indptr = self._drop_clashes(
+            problem, student_ids, position, clashes, indptr, cols, vals, ranks
+        )
+        preferences = len(cols)
+        # Students who want each activity and could take it
+        demand = np.bincount(cols, minlength=len(activity_ids))
+        compiled = time.perf_counter()
+
+        n = len(student_ids)
+        assigned = []
+        state = []
+        remaining = capacity.copy()
+        iterations = 0
+        for round_index in range(problem['max_per_student']):
+            keep = remaining[cols] > 0
+            round_cols, round_vals, _, round_indptr = _filter_edges(
+                keep, cols, vals, ranks, indptr
+            )
+            auction = _Round(round_indptr, round_cols, round_vals, remaining)
+            if previous is not None and round_index < len(previous['state']):
+                auction.seed(*_align(previous['state'][round_index], student_ids, position))
+            owner = auction.solve(self.eps)
+            iterations += auction.iterations
+            state.append({
+                student_ids[i]: (activity_ids[owner[i]], float(auction.bid[i]))
+                for i in np.flatnonzero(owner >= 0)
+            })
+
+            winners = np.flatnonzero(owner >= 0)
+            if not winners.size:
+                break
+            remaining -= np.bincount(owner[winners], minlength=len(remaining))
+
+            student_of_edge = np.repeat(np.arange(n), np.diff(indptr))
+            edge_pick = owner[student_of_edge]
+            has_pick = edge_pick >= 0
+            picked_edges = np.flatnonzero(cols == edge_pick)
+            assigned.extend(zip(
+                student_of_edge[picked_edges].tolist(), cols[picked_edges].tolist(),
+                ranks[picked_edges].tolist(), [round_index] * len(picked_edges)
+            ))
+
+            # Next round: drop the picked activity and everything clashing with it
+            # Students who got nothing this round will not get anything later
+            drop = np.ones(len(cols), dtype=bool)
+            drop[has_pick] = (cols[has_pick] == edge_pick[has_pick]) | clashes[cols[has_pick], edge_pick[has_pick]]
+            cols, vals, ranks, indptr = _filter_edges(~drop, cols, vals, ranks, indptr)
+
+        result, assignments = self._result(
+            problem, student_ids, activity_ids, capacity, demand, assigned, previous
+        )
+        result['stats'] = {
+            'students': n,
+            'activities': len(activities),
+            'preferences': preferences,
+            'iterations': iterations,
+            'incremental': previous is not None,
+            'compile_seconds': round(compiled - started, 4),
+            'solve_seconds': round(time.perf_counter() - compiled, 4)
+        }
+        self._last = {
+            'allocation_id': result['allocation_id'],
+            'problem': problem,
+            'state': state,
+            'assignments': assignments
+        }
+        return result
+
+    def _edges(self, problem, student_ids, position, categories, recommender, store):
+        """CSR arrays of each student's valid preferences and their scores"""
+        lengths = []
+        cols = []
+        ranks = []
+        fits = []
+        for student_id in student_ids:
+            student = problem['students'][student_id]
+            fit = self._fit(problem, student, recommender, store)
+            seen = set()
+            count = 0
+            for rank, activity_id in enumerate(student.get('preferences') or []):
+                j = position.get(activity_id)
+                if j is None or j in seen:
+                    continue
+                seen.add(j)
+                cols.append(j)
+                ranks.append(rank)
+                fits.append(fit.get(categories[j], 0.0))
+                count += 1
+            lengths.append(count)
+        indptr = np.zeros(len(student_ids) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        cols = np.array(cols, dtype=np.int64)
+        ranks = np.array(ranks, dtype=np.int64)
+        vals = self.rank_weight / (1.0 + ranks) + self.fit_weight * np.array(fits, dtype=float)
+        return indptr, cols, vals, ranks
+
+    def _fit(self, problem, student, recommender, store):
+        """
+        Predicted fit per category in [0, 1]: recommended categories score by
+        priority, categories the student already does well in by their score
+        """
+        if recommender is None:
+            return {}
+        cache = problem['fit_cache']['students']
+        student_id = student['student_id']
+        if student_id in cache:
+            return cache[student_id]
+        history = student.get('enrollment_history') or []
+        by_history = problem['fit_cache']['histories']
+        digest = history_digest(history)
+        fit = by_history.get(digest)
+        if fit is None:
+            result = store.get(student_id, history) if store is not None else None
+            # Stores built before category scores were kept cannot give the same fit
+            if result is None or 'student_preferences' not in result:
+                result = recommender.recommend(student_id, history)
+            fit = {}
+            for recommendation in result.get('recommendations', []):
+                category = recommendation['category']
+                fit[category] = max(fit.get(category, 0.0), 1.0 / recommendation['priority'])
+            for category, score in (result.get('student_preferences', {}).get('category_scores') or {}).items():
+                fit[category] = max(fit.get(category, 0.0), min(float(score) / 100.0, 1.0))
+            by_history[digest] = fit
+        cache[student_id] = fit
+        return fit
+
+    def _drop_clashes(self, problem, student_ids, position, clashes, indptr, cols, vals, ranks):
+        """Remove options already taken or clashing with current enrollments"""
+        enrolled = []
+        for student_id in student_ids:
+            enrolled.append([
+                position[a] for a in problem['students'][student_id].get('enrolled_activity_ids') or []
+                if a in position
+            ])
+        counts = np.array([len(e) for e in enrolled], dtype=np.int64)
+        if not counts.any():
+            return cols, vals, ranks, indptr
+        flat = np.array([a for e in enrolled for a in e], dtype=np.int64)
+        degree = np.diff(indptr)
+        edge_student = np.repeat(np.arange(len(student_ids)), degree)
+        per_edge = counts[edge_student]
+        # Pair every edge with each of its student's enrolled activities
+        pair_edge = np.repeat(np.arange(len(cols)), per_edge)
+        enrolled_start = (np.cumsum(counts) - counts)[edge_student]
+        pair_offsets = np.cumsum(per_edge) - per_edge
+        pair_enrolled = flat[
+            np.repeat(enrolled_start, per_edge) + np.arange(per_edge.sum()) - np.repeat(pair_offsets, per_edge)
+        ]
+        bad = clashes[cols[pair_edge], pair_enrolled] | (cols[pair_edge] == pair_enrolled)
+        drop = np.zeros(len(cols), dtype=bool)
+        drop[pair_edge[bad]] = True
+        return _filter_edges(~drop, cols, vals, ranks, indptr)
+
+    def _result(self, problem, student_ids, activity_ids, capacity, demand, assigned, previous):
+        assignments = {}
+        for i, j, rank, round_index in assigned:
+            assignments.setdefault(student_ids[i], []).append({
+                'activity_id': activity_ids[j],
+                'preference_rank': rank + 1,
+                'round': round_index + 1
+            })
+
+        allocated = np.zeros(len(activity_ids), dtype=np.int64)
+        for _, j, _, _ in assigned:
+            allocated[j] += 1
+        first_choice = sum(1 for _, _, rank, _ in assigned if rank == 0)
+        with_preferences = [s for s in student_ids if problem['students'][s].get('preferences')]
+
+        result = {
+            'allocation_id': uuid.uuid4().hex,
+            'assignments': [
+                {'student_id': student_id, 'activities': picks}
+                for student_id, picks in assignments.items()
+            ],
+            'unassigned': [s for s in with_preferences if s not in assignments],
+            'activities': [
+                {
+                    'activity_id': activity_id,
+                    'available_seats': int(capacity[j]),
+                    'allocated': int(allocated[j]),
+                    'demand': int(demand[j]),
+                    'oversubscribed': bool(demand[j] > capacity[j])
+                }
+                for j, activity_id in enumerate(activity_ids)
+            ],
+            'summary': {
+                'assigned_students': len(assignments),
+                'unassigned_students': len(with_preferences) - len(assignments),
+                'total_seats_allocated': len(assigned),
+                'first_choice_rate': round(first_choice / len(assigned), 4) if assigned else 0.0
+            }
+        }
+        if previous is not None:
+            before = previous['assignments']
+            result['changes'] = [
+                {
+                    'student_id': student_id,
+                    'from': [p['activity_id'] for p in before.get(student_id, [])],
+                    'to': [p['activity_id'] for p in assignments.get(student_id, [])]
+                }
+                for student_id in set(before) | set(assignments)
+                if [p['activity_id'] for p in before.get(student_id, [])]
+                != [p['activity_id'] for p in assignments.get(student_id, [])]
+            ]
+        return result, assignments
+
+
+def _filter_edges(keep, cols, vals, ranks, indptr):
+    """Apply an edge mask to CSR arrays"""
+    kept_before = np.concatenate(([0], np.cumsum(keep)))
+    return cols[keep], vals[keep], ranks[keep], kept_before[indptr]
+
+
+def _align(state, student_ids, position):
+    """Previous {student_id: (activity_id, bid)} as owner/bid arrays"""
+    owner = np.full(len(student_ids), -1, dtype=np.int64)
+    bid = np.zeros(len(student_ids))
+    for i, student_id in enumerate(student_ids):
+        held = state.get(student_id)
+        if held is not None and held[0] in position:
+            owner[i] = position[held[0]]
+            bid[i] = held[1]
+    return owner, bid
@@ -0,0 +1,289 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    tenant_id TEXT NOT NULL,
+    job_type TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    dedup_key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    lease_expires_at REAL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_dedup ON jobs (tenant_id, dedup_key);
+CREATE INDEX IF NOT EXISTS idx_jobs_fair ON jobs (status, tenant_id, created_at);
+'''
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+
+
+class JobDeferred(Exception):
+    """Raised by a handler to put its job back in the queue without using up an attempt"""
+
+
+def dedup_key(tenant_id, job_type, payload):
+    """Identical submissions from the same tenant share one job"""
+    canonical = json.dumps([tenant_id, job_type, payload], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class JobQueue:
+    """
+    Durable job queue for long-running analytics, backed by SQLite.
+
+    Jobs are claimed by worker threads under a lease that a heartbeat keeps
+    renewing. If the process dies, the lease lapses and any worker (in this
+    or another process sharing the database) picks the job up again, up to
+    `max_attempts`. Identical submissions are deduplicated while the earlier
+    job is queued, running or holds an unexpired result, and finished jobs
+    are deleted once `result_ttl` has passed.
+
+    Workers take tenants in turn (round-robin by tenant_id), oldest job
+    first within a tenant, so one school's backlog cannot starve the others.
+    """
+
+    def __init__(self, db_path, handlers, workers=2, result_ttl=86400,
+                 lease_seconds=60, max_attempts=3, poll_interval=0.5):
+        self.db_path = db_path
+        self.handlers = handlers
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._last_tenant = ''
+        self._claim_lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def is_ready(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def submit(self, tenant_id, job_type, payload):
+        """
+        Queue a job, or return the existing one for an identical submission
+
+        Returns:
+            (dict job status, bool deduplicated)
+        """
+        if job_type not in self.handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        key = dedup_key(tenant_id, job_type, payload)
+        now = time.time()
+        conn = self._connection()
+        with self._transaction(conn):
+            row = conn.execute(
+                '''SELECT job_id FROM jobs
+                   WHERE tenant_id = ? AND dedup_key = ? AND status != ?
+                     AND (expires_at IS NULL OR expires_at > ?)
+                   ORDER BY created_at DESC LIMIT 1''',
+                (tenant_id, key, FAILED, now)
+            ).fetchone()
+            if row is not None:
+                job_id, deduplicated = row[0], True
+            else:
+                job_id, deduplicated = uuid.uuid4().hex, False
+                conn.execute(
+                    '''INSERT INTO jobs (job_id, tenant_id, job_type, payload, dedup_key, status, created_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                    (job_id, tenant_id, job_type, json.dumps(payload), key, QUEUED, now)
+                )
+        self._wake.set()
+        return self.status(tenant_id, job_id), deduplicated
+
+    def status(self, tenant_id, job_id):
+        """Job status without the result, or None if unknown to this tenant"""
+        row = self._connection().execute(
+            '''SELECT job_id, job_type, status, progress, message, error, attempts,
+                      created_at, started_at, finished_at, expires_at
+               FROM jobs WHERE job_id = ? AND tenant_id = ?''',
+            (job_id, tenant_id)
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ('job_id', 'type', 'status', 'progress', 'message', 'error', 'attempts',
+                'created_at', 'started_at', 'finished_at', 'expires_at')
+        return dict(zip(keys, row))
+
+    def result(self, tenant_id, job_id):
+        """
+        Returns:
+            (dict status, result or None), or (None, None) if unknown
+        """
+        status = self.status(tenant_id, job_id)
+        if status is None or status['status'] != SUCCEEDED:
+            return status, None
+        row = self._connection().execute(
+            'SELECT result FROM jobs WHERE job_id = ?', (job_id,)
+        ).fetchone()
+        return status, (json.loads(row[0]) if row and row[0] is not None else None)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    class _transaction:
+        """BEGIN IMMEDIATE ... COMMIT, so claims are atomic across processes"""
+
+        def __init__(self, conn):
+            self.conn = conn
+
+        def __enter__(self):
+            self.conn.execute('BEGIN IMMEDIATE')
+            return self.conn
+
+        def __exit__(self, exc_type, exc, tb):
+            self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+            return False
+
+    def _claim(self):
+        """
+        Take the oldest runnable job of the next tenant after the one served
+        last, reclaiming jobs whose lease lapsed
+        """
+        now = time.time()
+        conn = self._connection()
+        with self._claim_lock, self._transaction(conn):
+            # Jobs orphaned by a crashed or restarted worker
+            conn.execute(
+                '''UPDATE jobs SET status = ?, finished_at = ?, expires_at = ?,
+                          error = 'Job abandoned after repeated worker failures'
+                   WHERE status = ? AND lease_expires_at < ? AND attempts >= ?''',
+                (FAILED, now, now + self.result_ttl, RUNNING, now, self.max_attempts)
+            )
+            conn.execute(
+                '''UPDATE jobs SET status = ?, message = 'Requeued after worker restart'
+                   WHERE status = ? AND lease_expires_at < ?''',
+                (QUEUED, RUNNING, now)
+            )
+            select = '''SELECT job_id, tenant_id, job_type, payload FROM jobs
+                        WHERE status = ? AND tenant_id > ?
+                        ORDER BY tenant_id, created_at LIMIT 1'''
+            row = conn.execute(select, (QUEUED, self._last_tenant)).fetchone()
+            if row is None:
+                # Wrap around to the first tenant
+                row = conn.execute(select, (QUEUED, '')).fetchone()
+            if row is None:
+                return None
+            self._last_tenant = row[1]
+            conn.execute(
+                '''UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ?,
+                          lease_expires_at = ?, progress = 0
+                   WHERE job_id = ?''',
+                (RUNNING, now, now + self.lease_seconds, row[0])
+            )
+        return row[0], row[1], row[2], json.loads(row[3])
+
+    def _work(self):
+        last_cleanup = 0
+        while not self._stop.is_set():
+            try:
+                if time.time() - last_cleanup > 60:
+                    self._expire()
+                    last_cleanup = time.time()
+                job = self._claim()
+            except sqlite3.Error as e:
+                print(f"Job queue error: {e}")
+                job = None
+            if job is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            self._run(*job)
+
+    def _run(self, job_id, tenant_id, job_type, payload):
+        conn = self._connection()
+        finished = threading.Event()
+        last_report = [0.0]
+
+        def heartbeat():
+            beat = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            try:
+                while not finished.wait(self.lease_seconds / 3):
+                    beat.execute(
+                        'UPDATE jobs SET lease_expires_at = ? WHERE job_id = ? AND status = ?',
+                        (time.time() + self.lease_seconds, job_id, RUNNING)
+                    )
+            finally:
+                beat.close()
+
+        def progress(fraction, message=None):
+            # Throttle writes; the final state is recorded on completion anyway
+            now = time.time()
+            if now - last_report[0] < 0.5:
+                return
+            last_report[0] = now
+            conn.execute(
+                'UPDATE jobs SET progress = ?, message = ? WHERE job_id = ?',
+                (round(float(fraction), 4), message, job_id)
+            )
+
+        beat = threading.Thread(target=heartbeat, daemon=True)
+        beat.start()
+        try:
+            result = self.handlers[job_type](tenant_id, payload, progress)
+            now = time.time()
+            conn.execute(
+                '''UPDATE jobs SET status = ?, progress = 1, result = ?, message = NULL,
+                          finished_at = ?, expires_at = ? WHERE job_id = ?''',
+                (SUCCEEDED, json.dumps(result, default=float), now, now + self.result_ttl, job_id)
+            )
+        except JobDeferred as e:
+            conn.execute(
+                '''UPDATE jobs SET status = ?, attempts = attempts - 1, message = ?,
+                          started_at = NULL, lease_expires_at = NULL
+                   WHERE job_id = ?''',
+                (QUEUED, str(e), job_id)
+            )
+        except Exception as e:
+            now = time.time()
+            conn.execute(
+                '''UPDATE jobs SET status = ?, error = ?, finished_at = ?, expires_at = ?
+                   WHERE job_id = ?''',
+                (FAILED, str(e), now, now + self.result_ttl, job_id)
+            )
+        finally:
+            finished.set()
+            beat.join()
+
+    def _expire(self):
+        self._connection().execute(
+            'DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at < ?', (time.time(),)
+        )
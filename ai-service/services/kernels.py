@@ -0,0 +1,122 @@
+"""
+Fused NumPy inference kernels compiled from fitted scikit-learn artifacts.
+
+Compiling folds feature standardization into the model parameters, so
+serving is a single affine transform followed by a sigmoid/softmax or an
+argmin, with no scikit-learn import or input validation on the hot path.
+Kernels are saved as plain .npz files.
+"""
+import numpy as np
+
+
+def _as_2d(X):
+    X = np.asarray(X, dtype=float)
+    return X.reshape(1, -1) if X.ndim == 1 else X
+
+
+def _safe_scale(scale):
+    """StandardScaler leaves zero-variance features unscaled"""
+    scale = np.asarray(scale, dtype=float)
+    return np.where(scale == 0, 1.0, scale)
+
+
+class LogisticKernel:
+    """StandardScaler followed by LogisticRegression, fused into one matmul"""
+
+    def __init__(self, weights, bias, classes):
+        self.weights = weights
+        self.bias = bias
+        self.classes = classes
+
+    @classmethod
+    def compile(cls, mean, scale, coef, intercept, classes):
+        """
+        (x - mean) / scale @ coef.T + intercept
+            == x @ (coef / scale).T + (intercept - coef @ (mean / scale))
+        """
+        scale = _safe_scale(scale)
+        coef = np.asarray(coef, dtype=float)
+        weights = (coef / scale).T
+        bias = np.asarray(intercept, dtype=float) - coef @ (np.asarray(mean, dtype=float) / scale)
+        return cls(np.ascontiguousarray(weights), bias, np.asarray(classes))
+
+    @classmethod
+    def from_sklearn(cls, scaler, model):
+        return cls.compile(scaler.mean_, scaler.scale_, model.coef_, model.intercept_, model.classes_)
+
+    def decision_function(self, X):
+        scores = _as_2d(X) @ self.weights + self.bias
+        return scores[:, 0] if scores.shape[1] == 1 else scores
+
+    def predict_proba(self, X):
+        scores = _as_2d(X) @ self.weights + self.bias
+        if scores.shape[1] == 1:
+            positive = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+            return np.column_stack((1.0 - positive, positive))
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+
+    def predict(self, X):
+        return self.classes[np.argmax(self.predict_proba(X), axis=1)]
+
+    def arrays(self):
+        return {'weights': self.weights, 'bias': self.bias, 'classes': self.classes}
+
+    def save(self, path):
+        np.savez(path, kind='logistic', **self.arrays())
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays['weights'], arrays['bias'], arrays['classes'])
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            if str(data['kind']) != 'logistic':
+                raise ValueError(f"{path} is not a logistic kernel")
+            return cls.from_arrays({key: data[key] for key in ('weights', 'bias', 'classes')})
+
+
+class NearestCentroidKernel:
+    """
+    StandardScaler followed by nearest-centroid assignment (KMeans.predict),
+    fused into one matmul and an argmin.
+
+    With z = x / scale and c' = centroid + mean / scale, the squared distance
+    |z - c'|^2 = |z|^2 - 2 z.c' + |c'|^2, and |z|^2 is the same for every
+    centroid, so argmin_k distance == argmin_k (x @ W + b)_k.
+    """
+
+    def __init__(self, weights, bias):
+        self.weights = weights
+        self.bias = bias
+
+    @classmethod
+    def compile(cls, mean, scale, centroids):
+        inverse = 1.0 / _safe_scale(scale)
+        shifted = np.asarray(centroids, dtype=float) + np.asarray(mean, dtype=float) * inverse
+        weights = -2.0 * inverse[:, None] * shifted.T
+        bias = np.einsum('ij,ij->i', shifted, shifted)
+        return cls(np.ascontiguousarray(weights), bias)
+
+    def predict(self, X):
+        return np.argmin(_as_2d(X) @ self.weights + self.bias, axis=1)
+
+    def arrays(self):
+        return {'weights': self.weights, 'bias': self.bias}
+
+    def save(self, path):
+        np.savez(path, kind='nearest_centroid', **self.arrays())
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays['weights'], arrays['bias'])
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            if str(data['kind']) != 'nearest_centroid':
+                raise ValueError(f"{path} is not a nearest-centroid kernel")
+            return cls.from_arrays({key: data[key] for key in ('weights', 'bias')})
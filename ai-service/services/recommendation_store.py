@@ -0,0 +1,268 @@
+import hashlib
+import json
+import mmap
+import os
+import threading
+import uuid
+
+import numpy as np
+
+MAGIC = b'RECKV001'
+HEADER = np.dtype([
+    ('magic', 'S8'),
+    ('n_slots', '<u8'),
+    ('n_entries', '<u8'),
+    ('data_offset', '<u8')
+])
+SLOT = np.dtype([
+    ('key', '<i8'),
+    ('offset', '<u8'),
+    ('length', '<u4'),
+    ('state', '<u4'),
+    ('digest', '<u8')
+])
+
+EMPTY, LIVE, INVALIDATED = 0, 1, 2
+_GOLDEN = 0x9E3779B97F4A7C15
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+
+
+def history_digest(enrollment_history):
+    """Stable 64-bit fingerprint of an enrollment history"""
+    payload = json.dumps(enrollment_history or [], sort_keys=True, separators=(',', ':'))
+    return int.from_bytes(hashlib.blake2b(payload.encode(), digest_size=8).digest(), 'little')
+
+
+class RecommendationStore:
+    """
+    Memory-mapped key-value file of precomputed recommendations keyed by
+    student_id.
+
+    File layout: a fixed header, an open-addressing hash table of fixed-size
+    slots (linear probing, load factor <= 0.5), then the JSON payloads. A
+    lookup touches one header read and, on average, one or two slots, so it
+    is constant time regardless of the number of students.
+
+    Another process may rebuild the file at any time; reads and invalidations
+    stat the path first and remap when it was replaced or modified.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        # Serializes file replacement; the temp file name is unique per
+        # build, so builds in other processes never share an inode either
+        self._build_lock = threading.Lock()
+        self._mmap = None
+        self._slots = None
+        self._bits = 0
+        self._stamp = None
+        self._open()
+
+    def is_ready(self):
+        return self._slots is not None
+
+    def build(self, recommender, students):
+        """
+        Precompute recommendations for every student and atomically replace
+        the store file
+
+        Args:
+            recommender: ActivityRecommender
+            students: list of dicts with keys:
+                - student_id: int
+                - enrollment_history: list of dicts
+
+        Returns:
+            dict with build statistics
+        """
+        try:
+            entries = {}
+            for student in students:
+                student_id = int(student['student_id'])
+                history = student.get('enrollment_history', [])
+                result = recommender.recommend(student_id, history)
+                payload = json.dumps({
+                    'recommendations': result['recommendations'],
+                    'reasoning': result['reasoning'],
+                    'student_preferences': result['student_preferences']
+                }, separators=(',', ':')).encode()
+                entries[student_id] = (payload, history_digest(history))
+
+            n_slots = 1 << max(4, (2 * len(entries) - 1).bit_length())
+            bits = n_slots.bit_length() - 1
+            slots = np.zeros(n_slots, dtype=SLOT)
+            data_offset = HEADER.itemsize + n_slots * SLOT.itemsize
+
+            blobs = []
+            offset = data_offset
+            for student_id, (payload, digest) in entries.items():
+                index = self._home(student_id, bits)
+                while slots[index]['state'] != EMPTY:
+                    index = (index + 1) & (n_slots - 1)
+                slots[index] = (student_id, offset, len(payload), LIVE, digest)
+                blobs.append(payload)
+                offset += len(payload)
+
+            header = np.array([(MAGIC, n_slots, len(entries), data_offset)], dtype=HEADER)
+
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp-{uuid.uuid4().hex}"
+            with self._build_lock:
+                try:
+                    with open(tmp_path, 'wb') as f:
+                        f.write(header.tobytes())
+                        f.write(slots.tobytes())
+                        for payload in blobs:
+                            f.write(payload)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    # Release first: a mapped file cannot be replaced on Windows
+                    self._release()
+                    os.replace(tmp_path, self.path)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                self._open()
+
+            return {
+                'students': len(entries),
+                'slots': n_slots,
+                'bytes': offset
+            }
+
+        except Exception as e:
+            raise Exception(f"Recommendation precompute error: {str(e)}")
+
+    def get(self, student_id, enrollment_history=None):
+        """
+        Look up precomputed recommendations
+
+        If `enrollment_history` is given, the entry is only served when it was
+        computed from the same history, so stale entries are never returned.
+
+        Returns:
+            dict with recommendations, reasoning and student_preferences,
+            or None on a miss
+        """
+        self._refresh()
+        with self._lock:
+            slots = self._slots
+            mm = self._mmap
+            if slots is None:
+                return None
+            index = self._find(slots, student_id)
+            if index is None:
+                return None
+            slot = slots[index]
+            if slot['state'] != LIVE:
+                return None
+            if enrollment_history is not None and int(slot['digest']) != history_digest(enrollment_history):
+                return None
+            start = int(slot['offset'])
+            payload = mm[start:start + int(slot['length'])]
+        return json.loads(payload)
+
+    def invalidate(self, student_ids):
+        """
+        Mark entries stale in place so the next request falls back to live
+        computation. The change is written through to the file.
+
+        Returns:
+            int, number of entries invalidated
+        """
+        invalidated = 0
+        self._refresh()
+        with self._lock:
+            if self._slots is None:
+                return 0
+            for student_id in student_ids:
+                index = self._find(self._slots, student_id)
+                if index is not None and self._slots[index]['state'] == LIVE:
+                    self._slots[index]['state'] = INVALIDATED
+                    invalidated += 1
+            if invalidated:
+                self._mmap.flush()
+                # Our own write is not a change to remap for
+                self._stamp = self._file_stamp()
+        return invalidated
+
+    def stats(self):
+        self._refresh()
+        with self._lock:
+            if self._slots is None:
+                return {'loaded': False}
+            states = self._slots['state']
+            return {
+                'loaded': True,
+                'slots': int(states.size),
+                'live': int(np.count_nonzero(states == LIVE)),
+                'invalidated': int(np.count_nonzero(states == INVALIDATED))
+            }
+
+    def _open(self):
+        """Map the store file if it exists"""
+        with self._lock:
+            try:
+                if os.path.exists(self.path) and os.path.getsize(self.path) >= HEADER.itemsize:
+                    with open(self.path, 'r+b') as f:
+                        mm = mmap.mmap(f.fileno(), 0)
+                        info = os.fstat(f.fileno())
+                    self._stamp = (info.st_ino, info.st_mtime_ns, info.st_size)
+                    header = np.frombuffer(mm, dtype=HEADER, count=1)[0]
+                    if header['magic'] != MAGIC:
+                        raise ValueError(f"{self.path} is not a recommendation store")
+                    n_slots = int(header['n_slots'])
+                    self._slots = np.frombuffer(mm, dtype=SLOT, count=n_slots, offset=HEADER.itemsize)
+                    self._bits = n_slots.bit_length() - 1
+                    self._mmap = mm
+            except Exception as e:
+                print(f"Error loading recommendation store: {e}")
+
+    def _release(self):
+        """
+        Drop the current mapping. numpy views hold an export on the mmap, so
+        it is released by reference counting rather than mmap.close().
+        """
+        with self._lock:
+            self._mmap = self._slots = None
+            self._bits = 0
+            self._stamp = None
+
+    def _file_stamp(self):
+        try:
+            info = os.stat(self.path)
+        except OSError:
+            return None
+        return (info.st_ino, info.st_mtime_ns, info.st_size)
+
+    def _refresh(self):
+        """Remap if the file was replaced, rewritten or removed since mapping"""
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return
+        self._release()
+        if stamp is not None:
+            self._open()
+            # Don't retry an unreadable file on every lookup
+            self._stamp = stamp
+
+    def _find(self, slots, student_id):
+        try:
+            key = int(student_id)
+        except (TypeError, ValueError):
+            return None
+        mask = slots.size - 1
+        index = self._home(key, self._bits)
+        for _ in range(slots.size):
+            slot = slots[index]
+            if slot['state'] == EMPTY:
+                return None
+            if int(slot['key']) == key:
+                return index
+            index = (index + 1) & mask
+        return None
+
+    @staticmethod
+    def _home(key, bits):
+        return ((key * _GOLDEN) & _MASK64) >> (64 - bits)
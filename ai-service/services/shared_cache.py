@@ -0,0 +1,144 @@
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import numpy as np
+
+
+def default_cache_dir():
+    """RAM-backed /dev/shm where available, otherwise next to the models"""
+    if os.path.isdir('/dev/shm'):
+        return os.path.join('/dev/shm', 'school-erp-ai')
+    return os.path.join('models', 'shared')
+
+
+class SharedEntry:
+    """One published version: read-only memory-mapped arrays plus metadata"""
+
+    def __init__(self, name, version, arrays, meta):
+        self.name = name
+        self.version = version
+        self.arrays = arrays
+        self.meta = meta
+
+    def __getitem__(self, key):
+        return self.arrays[key]
+
+
+class SharedArrayCache:
+    """
+    Host-wide cache of read-only arrays shared by every worker process.
+
+    Each publication is a directory of .npy files that workers memory-map
+    read-only, so all processes share the same physical pages. Publishing is
+    copy-on-write: arrays are written to a private temp directory, renamed to
+    a new version directory, and only then is the entry's CURRENT pointer
+    atomically replaced. Readers therefore always see either the old or the
+    new version, never a partial one, and mappings of an old version stay
+    valid until the reader lets go of them.
+    """
+
+    def __init__(self, root=None, keep_versions=2):
+        self.root = root or default_cache_dir()
+        self.keep_versions = keep_versions
+        self._lock = threading.Lock()
+        self._attached = {}
+
+    def publish(self, name, arrays, meta=None):
+        """
+        Publish a new version of `name`
+
+        Args:
+            name: str, cache entry name
+            arrays: dict of key -> numpy array
+            meta: optional JSON-serializable dict
+
+        Returns:
+            str, the new version id
+        """
+        try:
+            entry_dir = os.path.join(self.root, name)
+            os.makedirs(entry_dir, exist_ok=True)
+            version = f"{time.time_ns():020d}-{os.getpid()}"
+            tmp_dir = os.path.join(entry_dir, f".tmp-{uuid.uuid4().hex}")
+            os.makedirs(tmp_dir)
+
+            for key, array in arrays.items():
+                np.save(os.path.join(tmp_dir, f"{key}.npy"), np.ascontiguousarray(array), allow_pickle=False)
+            with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+                json.dump({'keys': list(arrays), 'meta': meta or {}}, f)
+
+            os.rename(tmp_dir, os.path.join(entry_dir, version))
+
+            pointer_tmp = os.path.join(entry_dir, f".CURRENT-{uuid.uuid4().hex}")
+            with open(pointer_tmp, 'w') as f:
+                f.write(version)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(pointer_tmp, os.path.join(entry_dir, 'CURRENT'))
+
+            self._collect_garbage(entry_dir, version)
+            return version
+
+        except Exception as e:
+            raise Exception(f"Shared cache publish error: {str(e)}")
+
+    def current_version(self, name):
+        try:
+            with open(os.path.join(self.root, name, 'CURRENT')) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def attach(self, name):
+        """
+        Map the current version of `name`, reusing this process's mapping if
+        it is still current
+
+        Returns:
+            SharedEntry, or None if nothing has been published
+        """
+        version = self.current_version(name)
+        if version is None:
+            return None
+        with self._lock:
+            entry = self._attached.get(name)
+            if entry is not None and entry.version == version:
+                return entry
+        try:
+            entry = self._load(name, version)
+        except FileNotFoundError:
+            # Garbage-collected between reading CURRENT and mapping; retry once
+            version = self.current_version(name)
+            if version is None:
+                return None
+            entry = self._load(name, version)
+        with self._lock:
+            self._attached[name] = entry
+        return entry
+
+    def _load(self, name, version):
+        version_dir = os.path.join(self.root, name, version)
+        with open(os.path.join(version_dir, 'meta.json')) as f:
+            info = json.load(f)
+        arrays = {
+            key: np.load(os.path.join(version_dir, f"{key}.npy"), mmap_mode='r', allow_pickle=False)
+            for key in info['keys']
+        }
+        return SharedEntry(name, version, arrays, info['meta'])
+
+    def _collect_garbage(self, entry_dir, current):
+        """
+        Remove all but the newest versions. Processes that still map a removed
+        version keep working on POSIX; where removal fails (e.g. a mapped file
+        on Windows) it is retried on the next publish.
+        """
+        versions = sorted(
+            d for d in os.listdir(entry_dir)
+            if not d.startswith('.') and d != 'CURRENT' and d != current
+        )
+        for stale in versions[:max(0, len(versions) - (self.keep_versions - 1))]:
+            shutil.rmtree(os.path.join(entry_dir, stale), ignore_errors=True)
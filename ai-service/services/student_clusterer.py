@@ -1,20 +1,109 @@
 import numpy as np
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
+import os
+import uuid
+from services.kernels import NearestCentroidKernel
 
 class StudentClusterer:
     """
     Clusters students using K-Means based on performance and engagement
+    
+    Each K-Means run returns its fitted scaler and centroids as a fused
+    nearest-centroid kernel, which can be exported as the reference and
+    assigns new students to those clusters without refitting or importing
+    scikit-learn. The reference is reloaded whenever its file changes, so a
+    reference saved by one worker process is picked up by the others.
     """
     
-    def __init__(self):
+    SKILL_MAP = {'beginner': 1, 'intermediate': 2, 'advanced': 3, 'expert': 4}
+    
+    def __init__(self, model_dir='models'):
         self.ready = True
-        self.scaler = StandardScaler()
         self.n_clusters = 3  # High performers, Average, Needs support
+        self.kernel_path = os.path.join(model_dir, 'cluster_kernel.npz')
+        self._kernel_stamp = None
+        self.reference_kernel = self._load_kernel()
     
     def is_ready(self):
         return self.ready
     
+    def _file_stamp(self):
+        try:
+            info = os.stat(self.kernel_path)
+        except OSError:
+            return None
+        return (info.st_ino, info.st_mtime_ns, info.st_size)
+    
+    def _load_kernel(self):
+        self._kernel_stamp = self._file_stamp()
+        try:
+            if self._kernel_stamp is not None:
+                return NearestCentroidKernel.load(self.kernel_path)
+        except Exception as e:
+            print(f"Error loading cluster kernel: {e}")
+        return None
+    
+    def _refresh_reference(self):
+        """Reload the reference if another process saved a new one"""
+        if self._file_stamp() != self._kernel_stamp:
+            self.reference_kernel = self._load_kernel()
+    
+    def export_kernel(self, kernel, path=None):
+        """Save the kernel of a clustering run (cluster()['kernel']) as the reference"""
+        if kernel is None:
+            raise Exception("No fitted clustering to export")
+        path = path or self.kernel_path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Write aside and swap in, so other workers never load a partial file
+        tmp_path = f"{path}.tmp-{uuid.uuid4().hex}.npz"
+        try:
+            kernel.save(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.reference_kernel = kernel
+        if path == self.kernel_path:
+            self._kernel_stamp = self._file_stamp()
+        return path
+    
+    def assign(self, student_data):
+        """
+        Assign students to the reference clusters without refitting
+        
+        Returns:
+            list of dicts with student_id and cluster
+        """
+        try:
+            self._refresh_reference()
+            if self.reference_kernel is None:
+                raise Exception("No reference clustering has been saved")
+            
+            features = np.array([self.feature_vector(s) for s in student_data], dtype=float)
+            labels = self.reference_kernel.predict(features)
+            
+            return [
+                {
+                    'student_id': student.get('student_id'),
+                    'cluster': int(label),
+                    'cluster_name': f"cluster_{label}"
+                }
+                for student, label in zip(student_data, labels)
+            ]
+            
+        except Exception as e:
+            raise Exception(f"Cluster assignment error: {str(e)}")
+    
+    @classmethod
+    def feature_vector(cls, student):
+        """Raw [attendance, score, skill] features used for clustering"""
+        attendance = student.get('attendance_percentage', 0)
+        score = student.get('average_score', 0)
+        
+        # Convert skill level to numeric
+        skill_numeric = cls.SKILL_MAP.get(student.get('skill_level', 'beginner'), 1)
+        
+        return [attendance, score, skill_numeric]
+    
     def cluster(self, student_data):
         """
         Cluster students based on performance metrics
@@ -28,7 +117,8 @@ class StudentClusterer:
                 - skill_level: str
         
         Returns:
-            dict with cluster assignments
+            dict with cluster assignments and the run's `kernel`
+            (None when too few students for K-Means)
         """
         try:
             if len(student_data) < 3:
@@ -40,12 +130,7 @@ class StudentClusterer:
             student_info = []
             
             for student in student_data:
-                attendance = student.get('attendance_percentage', 0)
-                score = student.get('average_score', 0)
-                
-                # Convert skill level to numeric
-                skill_map = {'beginner': 1, 'intermediate': 2, 'advanced': 3, 'expert': 4}
-                skill_numeric = skill_map.get(student.get('skill_level', 'beginner'), 1)
+                attendance, score, skill_numeric = self.feature_vector(student)
                 
                 features.append([attendance, score, skill_numeric])
                 student_info.append({
@@ -56,15 +141,28 @@ class StudentClusterer:
                     'skill_level': student.get('skill_level', 'beginner')
                 })
             
+            from sklearn.cluster import KMeans
+            from sklearn.preprocessing import StandardScaler
+            
             # Normalize features
             features_array = np.array(features)
-            features_scaled = self.scaler.fit_transform(features_array)
+            scaler = StandardScaler()
+            features_scaled = scaler.fit_transform(features_array)
             
             # Perform K-Means clustering
             n_clusters = min(self.n_clusters, len(student_data))
             kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
             cluster_labels = kmeans.fit_predict(features_scaled)
-            
+
+            # K-Means numbers clusters arbitrarily; renumber them by centroid
+            # (best attendance + score first) so labels are stable across runs
+            centroids = scaler.inverse_transform(kmeans.cluster_centers_)
+            order = np.argsort(-(centroids[:, 0] + centroids[:, 1]), kind='stable')
+            cluster_labels = np.argsort(order)[cluster_labels]
+            kernel = NearestCentroidKernel.compile(
+                scaler.mean_, scaler.scale_, kmeans.cluster_centers_[order]
+            )
+
             # Organize students by cluster
             clusters = {}
             for i, label in enumerate(cluster_labels):
@@ -82,7 +180,8 @@ class StudentClusterer:
                 'clusters': clusters,
                 'descriptions': cluster_descriptions,
                 'total_students': len(student_data),
-                'n_clusters': n_clusters
+                'n_clusters': n_clusters,
+                'kernel': kernel
             }
             
         except Exception as e:
@@ -145,7 +244,8 @@ class StudentClusterer:
             'clusters': clusters,
             'descriptions': descriptions,
             'total_students': len(student_data),
-            'n_clusters': 3
+            'n_clusters': 3,
+            'kernel': None
         }
     
     def _analyze_clusters(self, clusters, features, labels):
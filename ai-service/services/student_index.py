@@ -0,0 +1,468 @@
+import threading
+import time
+
+import numpy as np
+
+from services.student_clusterer import StudentClusterer
+
+SKILL_NAMES = {value: name for name, value in StudentClusterer.SKILL_MAP.items()}
+
+
+def _tree_to_arrays(tree):
+    """Split a KDTree's pickled state into arrays and a JSON-able layout"""
+    arrays, layout = {}, []
+    for position, item in enumerate(tree.__getstate__()):
+        if isinstance(item, np.ndarray):
+            arrays[f"tree_{position}"] = item
+            layout.append(['array', f"tree_{position}"])
+        elif isinstance(item, (int, np.integer)):
+            layout.append(['int', int(item)])
+        else:
+            # Distance metric and other objects come from a template tree
+            layout.append(['template', None])
+    return arrays, layout
+
+
+def _tree_from_arrays(arrays, layout, leaf_size):
+    """Rebuild a KDTree around (possibly memory-mapped) arrays without copying"""
+    from sklearn.neighbors import KDTree
+
+    template = KDTree(np.zeros((1, 3)), leaf_size=leaf_size).__getstate__()
+    if len(template) != len(layout):
+        raise ValueError('KDTree state layout changed')
+    state = tuple(
+        arrays[value] if kind == 'array' else value if kind == 'int' else template[position]
+        for position, (kind, value) in enumerate(layout)
+    )
+    tree = KDTree.__new__(KDTree)
+    tree.__setstate__(state)
+    return tree
+
+
+class StudentIndex:
+    """
+    In-memory nearest-neighbour index over the same standardized
+    [attendance, score, skill] features used by StudentClusterer.
+
+    The bulk of the students live in a KD-tree. Inserts and updates land in a
+    small append buffer that is searched by brute force alongside the tree
+    (updated students are tombstoned in the tree). Once the buffer and
+    tombstones grow past a fraction of the tree, the tree is rebuilt in a
+    background thread and swapped in, replaying inserts made meanwhile.
+
+    With a SharedArrayCache, every fitted tree is published host-wide and the
+    other worker processes map it zero-copy instead of holding their own
+    copy. Each worker keeps its own insert buffer and replays it on top of a
+    newly attached tree, so bulk loads should go through a single worker.
+    """
+
+    SHARED_NAME = 'student_index'
+
+    def __init__(self, leaf_size=40, rebuild_fraction=0.05, rebuild_min=1024, shared_cache=None):
+        self.leaf_size = leaf_size
+        self.rebuild_fraction = rebuild_fraction
+        self.rebuild_min = rebuild_min
+        self.shared_cache = shared_cache
+        self._shared_version = None
+        self._lock = threading.Lock()
+        self._publish_lock = threading.Lock()
+        self._journal = None
+        # Bumped by every build(); a rebuild or build whose generation is no
+        # longer current must not publish or install its tree
+        self._generation = 0
+        self._installed = 0
+        self._install(*self._fit(np.empty(0, dtype=np.int64), np.empty((0, 3))))
+        self._sync_shared()
+
+    def is_ready(self):
+        return True
+
+    def size(self):
+        with self._lock:
+            return self._size()
+
+    # Tree arrays, ids, raw features and alive flags per indexed student
+    BYTES_PER_STUDENT = 96
+
+    def memory_usage(self):
+        """Approximate memory held by the index, in bytes (mapped arrays included)"""
+        with self._lock:
+            arrays = [self._tree_ids, self._tree_raw, self._tree_alive,
+                      self._buf_ids, self._buf_raw, self._buf_alive]
+            if self._tree is not None:
+                arrays.extend(self._tree.get_arrays())
+            return sum(a.nbytes for a in arrays) + 128 * len(self._buf_rows)
+
+    def build(self, student_data):
+        """
+        Replace the index contents with `student_data`
+
+        Args:
+            student_data: list of dicts with keys:
+                - student_id: int
+                - attendance_percentage: float
+                - average_score: float
+                - skill_level: str
+        """
+        try:
+            ids, raw = self._extract(student_data)
+            # Later duplicates win, matching upsert semantics
+            _, last = np.unique(ids[::-1], return_index=True)
+            keep = np.sort(len(ids) - 1 - last)
+            with self._lock:
+                self._generation += 1
+                generation = self._generation
+            try:
+                shared = self._share(self._fit(ids[keep], raw[keep]), generation)
+            except Exception:
+                with self._lock:
+                    if generation == self._generation:
+                        # Keep the old contents and let rebuilds resume
+                        self._installed = generation
+                raise
+            with self._lock:
+                # Skipped when a later build() superseded this one
+                if shared is not None and generation == self._generation:
+                    self._install(*shared[0])
+                    self._shared_version = shared[1]
+                    self._installed = generation
+                    self._journal = None
+                return self._stats()
+
+        except Exception as e:
+            raise Exception(f"Index build error: {str(e)}")
+
+    def upsert(self, student_data):
+        """Insert new students or update existing ones"""
+        try:
+            ids, raw = self._extract(student_data)
+            self._sync_shared()
+            with self._lock:
+                if self._tree_size == 0 and self._buf_len == 0:
+                    empty = True
+                else:
+                    empty = False
+                    for student_id, features in zip(ids.tolist(), raw):
+                        self._insert(student_id, features)
+                        if self._journal is not None:
+                            self._journal.append((student_id, features))
+                    if self._pending() > max(self.rebuild_min, self.rebuild_fraction * self._tree_size):
+                        self._start_rebuild()
+            if empty:
+                return self.build(student_data)
+            with self._lock:
+                return self._stats()
+
+        except Exception as e:
+            raise Exception(f"Index update error: {str(e)}")
+
+    def rebuild(self, wait=False):
+        """Compact the buffer and tombstones into a fresh tree"""
+        with self._lock:
+            thread = self._start_rebuild()
+        if wait and thread is not None:
+            thread.join()
+
+    def flush(self, timeout=60):
+        """
+        Fold buffered updates into a published tree so that a fresh instance
+        attaching the shared cache sees the same students
+
+        Returns:
+            bool, False if the index holds students it cannot persist
+        """
+        if self.shared_cache is None:
+            return self.size() == 0
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            with self._lock:
+                if self._journal is None and self._pending() == 0:
+                    return self._tree_size == 0 or self._shared_version is not None
+                thread = self._start_rebuild()
+            if thread is not None:
+                thread.join()
+            else:
+                # Another rebuild is running; wait for it to land
+                time.sleep(0.05)
+        return False
+
+    def query(self, student_id=None, features=None, k=5, radius=None):
+        """
+        Find the students most similar to a given student
+
+        Args:
+            student_id: int, an indexed student to search around (excluded
+                from the results)
+            features: dict with attendance_percentage, average_score and
+                skill_level, used when student_id is not given
+            k: int, maximum number of neighbours to return
+            radius: float, optional distance cut-off in standardized units
+
+        Returns:
+            list of dicts with student_id, distance and raw features
+        """
+        try:
+            self._sync_shared()
+            with self._lock:
+                if student_id is not None:
+                    raw = self._lookup(student_id)
+                    if raw is None:
+                        raise KeyError(f"student {student_id} is not indexed")
+                else:
+                    raw = np.asarray(StudentClusterer.feature_vector(features), dtype=float)
+
+                point = (raw - self._mean) / self._scale
+                exclude = int(student_id) if student_id is not None else None
+                candidates = self._search_tree(point, k, radius, exclude) + \
+                    self._search_buffer(point, k, radius, exclude)
+
+            candidates.sort(key=lambda c: c[0])
+            if k is not None:
+                candidates = candidates[:k]
+
+            return [
+                {
+                    'student_id': sid,
+                    'distance': round(float(distance), 4),
+                    'attendance': float(row[0]),
+                    'score': float(row[1]),
+                    'skill_level': SKILL_NAMES.get(int(row[2]), 'beginner')
+                }
+                for distance, sid, row in candidates
+            ]
+
+        except KeyError:
+            raise
+        except Exception as e:
+            raise Exception(f"Similarity query error: {str(e)}")
+
+    def _extract(self, student_data):
+        ids = np.array([int(s['student_id']) for s in student_data], dtype=np.int64)
+        raw = np.array(
+            [StudentClusterer.feature_vector(s) for s in student_data],
+            dtype=float
+        ).reshape(-1, 3)
+        return ids, raw
+
+    def _fit(self, ids, raw):
+        """Fit scaler and tree for a snapshot; runs without the lock held"""
+        order = np.argsort(ids, kind='stable')
+        ids, raw = ids[order], raw[order]
+        if not len(ids):
+            return ids, raw, np.zeros(3), np.ones(3), None
+
+        from sklearn.neighbors import KDTree
+
+        # Same standardization as StandardScaler (population std, 0 -> 1)
+        mean, scale = raw.mean(axis=0), raw.std(axis=0)
+        scale[scale == 0] = 1.0
+        tree = KDTree((raw - mean) / scale, leaf_size=self.leaf_size)
+        return ids, raw, mean, scale, tree
+
+    def _share(self, state, generation):
+        """
+        Publish a fitted snapshot and swap it for the shared mapping
+
+        Returns:
+            (state, shared version), or None if a build() since the fit made
+            the snapshot stale
+        """
+        with self._publish_lock:
+            with self._lock:
+                if generation != self._generation:
+                    return None
+            if self.shared_cache is None or state[4] is None:
+                return state, None
+            return self._publish(state)
+
+    def _publish(self, state):
+        try:
+            ids, raw, mean, scale, tree = state
+            tree_arrays, layout = _tree_to_arrays(tree)
+            self.shared_cache.publish(self.SHARED_NAME, {
+                'ids': ids, 'raw': raw, 'mean': mean, 'scale': scale, **tree_arrays
+            }, {'layout': layout, 'leaf_size': self.leaf_size})
+            entry = self.shared_cache.attach(self.SHARED_NAME)
+            return self._from_shared(entry), entry.version
+        except Exception as e:
+            print(f"Error sharing student index: {e}")
+            return state, None
+
+    def _from_shared(self, entry):
+        tree = _tree_from_arrays(entry.arrays, entry.meta['layout'], entry.meta['leaf_size'])
+        return entry['ids'], entry['raw'], entry['mean'], entry['scale'], tree
+
+    def _sync_shared(self):
+        """Attach a tree published by another worker, keeping local inserts"""
+        if self.shared_cache is None:
+            return
+        try:
+            entry = self.shared_cache.attach(self.SHARED_NAME)
+            if entry is None or entry.version == self._shared_version:
+                return
+            state = self._from_shared(entry)
+            with self._lock:
+                if entry.version == self._shared_version:
+                    return
+                live = np.flatnonzero(self._buf_alive[:self._buf_len])
+                pending = list(zip(self._buf_ids[live].tolist(), self._buf_raw[live].copy()))
+                self._install(*state)
+                self._shared_version = entry.version
+                for student_id, features in pending:
+                    self._insert(student_id, features)
+        except Exception as e:
+            print(f"Error attaching shared student index: {e}")
+
+    def _install(self, ids, raw, mean, scale, tree):
+        """Swap in a fitted snapshot and reset the buffer; caller holds the lock"""
+        self._tree_ids = ids
+        self._tree_raw = raw
+        self._tree_alive = np.ones(len(ids), dtype=bool)
+        self._tree_size = len(ids)
+        self._dead = 0
+        self._mean = mean
+        self._scale = scale
+        self._tree = tree
+        self._buf_ids = np.empty(64, dtype=np.int64)
+        self._buf_raw = np.empty((64, 3))
+        self._buf_alive = np.zeros(64, dtype=bool)
+        self._buf_len = 0
+        self._buf_rows = {}
+
+    def _size(self):
+        return self._tree_size - self._dead + len(self._buf_rows)
+
+    def _pending(self):
+        return self._buf_len + self._dead
+
+    def _stats(self):
+        return {
+            'indexed_students': self._size(),
+            'tree_size': self._tree_size,
+            'buffered': self._buf_len,
+            'tombstones': self._dead,
+            'rebuilding': self._journal is not None
+        }
+
+    def _tree_row(self, student_id):
+        row = int(np.searchsorted(self._tree_ids, student_id))
+        if row < self._tree_size and self._tree_ids[row] == student_id and self._tree_alive[row]:
+            return row
+        return None
+
+    def _lookup(self, student_id):
+        student_id = int(student_id)
+        row = self._buf_rows.get(student_id)
+        if row is not None:
+            return self._buf_raw[row]
+        row = self._tree_row(student_id)
+        return self._tree_raw[row] if row is not None else None
+
+    def _insert(self, student_id, features):
+        """Upsert one student into the buffer; caller holds the lock"""
+        row = self._buf_rows.get(student_id)
+        if row is not None:
+            self._buf_alive[row] = False
+        else:
+            row = self._tree_row(student_id)
+            if row is not None:
+                self._tree_alive[row] = False
+                self._dead += 1
+
+        if self._buf_len == len(self._buf_ids):
+            capacity = 2 * len(self._buf_ids)
+            self._buf_ids = np.resize(self._buf_ids, capacity)
+            self._buf_raw = np.resize(self._buf_raw, (capacity, 3))
+            self._buf_alive = np.concatenate((self._buf_alive, np.zeros(capacity // 2, dtype=bool)))
+
+        row = self._buf_len
+        self._buf_ids[row] = student_id
+        self._buf_raw[row] = features
+        self._buf_alive[row] = True
+        self._buf_rows[student_id] = row
+        self._buf_len += 1
+
+    def _search_tree(self, point, k, radius, exclude):
+        if self._tree is None:
+            return []
+        if radius is not None and k is None:
+            indices, distances = self._tree.query_radius(
+                point[None, :], r=radius, return_distance=True, sort_results=True
+            )
+            return self._collect(indices[0], distances[0], k, exclude)
+
+        # Over-fetch to skip tombstones and the excluded student, widening
+        # the search only when too many of the nearest rows were dead. A
+        # radius with k stays a bounded k-nearest search, cut at the radius.
+        count = min(self._tree_size, k + 2)
+        while True:
+            distances, indices = self._tree.query(point[None, :], k=count)
+            results = self._collect(indices[0], distances[0], k, exclude, radius)
+            if len(results) == k or count == self._tree_size or \
+                    (radius is not None and distances[0][-1] > radius):
+                return results
+            count = min(self._tree_size, 2 * count)
+
+    def _collect(self, indices, distances, k, exclude, radius=None):
+        results = []
+        for index, distance in zip(indices.tolist(), distances.tolist()):
+            if radius is not None and distance > radius:
+                break
+            sid = int(self._tree_ids[index])
+            if self._tree_alive[index] and sid != exclude:
+                results.append((distance, sid, self._tree_raw[index]))
+                if k is not None and len(results) == k:
+                    break
+        return results
+
+    def _search_buffer(self, point, k, radius, exclude):
+        if not self._buf_len:
+            return []
+        alive = np.flatnonzero(self._buf_alive[:self._buf_len])
+        distances = np.linalg.norm((self._buf_raw[alive] - self._mean) / self._scale - point, axis=1)
+        if radius is not None:
+            keep = distances <= radius
+            alive, distances = alive[keep], distances[keep]
+        order = np.argsort(distances)
+        if k is not None:
+            order = order[:k + 1]
+        return [
+            (float(distances[i]), int(self._buf_ids[alive[i]]), self._buf_raw[alive[i]])
+            for i in order
+            if int(self._buf_ids[alive[i]]) != exclude
+        ]
+
+    def _start_rebuild(self):
+        """Snapshot live rows and fit a new tree in the background; caller holds the lock"""
+        if self._journal is not None or self._installed != self._generation:
+            # Already rebuilding, or a build() is about to replace the index
+            return None
+        live = self._tree_alive
+        buf_live = np.flatnonzero(self._buf_alive[:self._buf_len])
+        ids = np.concatenate((self._tree_ids[live], self._buf_ids[buf_live]))
+        raw = np.concatenate((self._tree_raw[live], self._buf_raw[buf_live]))
+        self._journal = []
+        thread = threading.Thread(target=self._rebuild, args=(ids, raw, self._generation), daemon=True)
+        thread.start()
+        return thread
+
+    def _rebuild(self, ids, raw, generation):
+        try:
+            shared = self._share(self._fit(ids, raw), generation)
+        except Exception as e:
+            print(f"Error rebuilding student index: {e}")
+            with self._lock:
+                if generation == self._generation:
+                    self._journal = None
+            return
+        with self._lock:
+            if shared is None or generation != self._generation:
+                # A full build() replaced the index while we were fitting;
+                # it resets the journal when it installs
+                return
+            journal, self._journal = self._journal, None
+            state, version = shared
+            self._install(*state)
+            self._shared_version = version
+            for student_id, features in journal:
+                self._insert(student_id, features)
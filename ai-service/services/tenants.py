@@ -0,0 +1,270 @@
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+TENANT_ID = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+DEFAULT_TENANT = 'default'
+
+
+class TenantBusy(Exception):
+    """Raised when a tenant is already running its maximum concurrent requests"""
+
+
+class UnknownTenant(Exception):
+    """Raised for tenant ids that are not configured"""
+
+
+class TenantServices:
+    """
+    One tenant's partition: its own service instances plus the limits that
+    apply to it.
+    """
+
+    def __init__(self, tenant_id, services, memory_budget, max_concurrency):
+        self.tenant_id = tenant_id
+        self.services = services
+        self.memory_budget = memory_budget
+        self.max_concurrency = max_concurrency
+        self.semaphore = threading.BoundedSemaphore(max_concurrency)
+        self.inflight = 0
+        # Requests waiting for a slot; they pin the tenant like inflight ones
+        self.waiting = 0
+        self.last_used = time.time()
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__['services'][name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def memory_usage(self):
+        """Approximate bytes held by this tenant's caches and indexes"""
+        return sum(
+            service.memory_usage()
+            for service in self.services.values()
+            if hasattr(service, 'memory_usage')
+        )
+
+    def flush(self):
+        """
+        Persist whatever the services can and report whether the partition
+        can be dropped and rebuilt from disk without losing state
+        """
+        return all(
+            service.flush()
+            for service in self.services.values()
+            if hasattr(service, 'flush')
+        )
+
+    def trim(self):
+        """Shrink evictable caches until the tenant fits its budget"""
+        usage = self.memory_usage()
+        snapshots = self.services.get('cluster_snapshots')
+        if usage > self.memory_budget and snapshots is not None:
+            snapshots.trim(max(0, snapshots.memory_usage() - (usage - self.memory_budget)))
+        return self.memory_usage()
+
+
+class TenantRegistry:
+    """
+    Lazily creates per-tenant service partitions and enforces per-tenant
+    concurrency limits, per-tenant memory budgets and a global memory budget
+    shared by all tenants. Only configured tenant ids are served.
+
+    When the global budget is exceeded, the least recently used idle tenants
+    are evicted, provided their services could flush everything to disk;
+    tenants holding state that only lives in memory (buffered index updates
+    without a shared cache, the last enrollment allocation, a pinned drift
+    reference) are kept.
+    """
+
+    def __init__(self, factory, memory_budget, global_memory_budget,
+                 max_concurrency, queue_timeout=0, overrides=None, metrics=None,
+                 allowed=None):
+        self.factory = factory
+        self.allowed = set(allowed or ()) | {DEFAULT_TENANT}
+        self.memory_budget = memory_budget
+        self.global_memory_budget = global_memory_budget
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.overrides = overrides or {}
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        self._tenants = OrderedDict()
+
+    def get(self, tenant_id):
+        """
+        Return the tenant's partition, creating it on first use
+
+        Raises:
+            UnknownTenant: if the tenant id is not configured
+        """
+        if tenant_id not in self.allowed:
+            raise UnknownTenant(f"Tenant {tenant_id} not found")
+        with self._lock:
+            tenant = self._tenants.get(tenant_id)
+            if tenant is not None:
+                self._tenants.move_to_end(tenant_id)
+                return tenant
+        # Build outside the registry lock; loading models can take a while
+        override = self.overrides.get(tenant_id, {})
+        tenant = TenantServices(
+            tenant_id,
+            self.factory(tenant_id),
+            override.get('memory_budget', self.memory_budget),
+            override.get('max_concurrency', self.max_concurrency)
+        )
+        with self._lock:
+            # Another request may have built it meanwhile
+            tenant = self._tenants.setdefault(tenant_id, tenant)
+            self._tenants.move_to_end(tenant_id)
+            return tenant
+
+    def acquire(self, tenant_id):
+        """
+        Reserve a concurrency slot for one request
+
+        Raises:
+            TenantBusy: if no slot frees up within queue_timeout seconds
+        """
+        while True:
+            tenant = self.get(tenant_id)
+            with self._lock:
+                # Register as a waiter before blocking so eviction skips the
+                # tenant; retry if it was evicted since get()
+                if self._tenants.get(tenant_id) is tenant:
+                    tenant.waiting += 1
+                    break
+        acquired = tenant.semaphore.acquire(timeout=self.queue_timeout)
+        with self._lock:
+            tenant.waiting -= 1
+            if acquired:
+                tenant.inflight += 1
+                tenant.last_used = time.time()
+                self._tenants.move_to_end(tenant_id)
+        if not acquired:
+            raise TenantBusy(f"Tenant {tenant_id} has too many concurrent requests")
+        return tenant
+
+    def release(self, tenant):
+        with self._lock:
+            tenant.inflight -= 1
+        tenant.semaphore.release()
+        self.enforce_budgets(tenant.tenant_id)
+
+    def enforce_budgets(self, current=None):
+        """Trim the current tenant to its budget, then evict idle tenants globally"""
+        with self._lock:
+            tenants = list(self._tenants.values())
+        usage = {tenant.tenant_id: tenant.memory_usage() for tenant in tenants}
+
+        if current in usage:
+            tenant = next(t for t in tenants if t.tenant_id == current)
+            if usage[current] > tenant.memory_budget:
+                usage[current] = tenant.trim()
+
+        total = sum(usage.values())
+        if total <= self.global_memory_budget:
+            return
+
+        with self._lock:
+            candidates = [
+                tenant for tenant_id, tenant in self._tenants.items()
+                if tenant_id not in (DEFAULT_TENANT, current) and not (tenant.inflight or tenant.waiting)
+            ]
+        for tenant in candidates:
+            if total <= self.global_memory_budget:
+                break
+            # Flushing can rebuild an index, so it runs outside the lock
+            if not tenant.flush():
+                continue
+            with self._lock:
+                if tenant.inflight or tenant.waiting or self._tenants.get(tenant.tenant_id) is not tenant:
+                    continue
+                del self._tenants[tenant.tenant_id]
+            total -= usage.get(tenant.tenant_id, 0)
+            if self.metrics is not None:
+                self.metrics.evicted(tenant.tenant_id)
+
+    def fits_budget(self, tenant, additional_bytes):
+        """Whether the tenant can take on `additional_bytes` more memory"""
+        return tenant.memory_usage() + additional_bytes <= tenant.memory_budget
+
+    def stats(self):
+        with self._lock:
+            tenants = list(self._tenants.values())
+        return {
+            tenant.tenant_id: {
+                'memory_bytes': tenant.memory_usage(),
+                'memory_budget_bytes': tenant.memory_budget,
+                'inflight': tenant.inflight,
+                'max_concurrency': tenant.max_concurrency,
+                'last_used': tenant.last_used
+            }
+            for tenant in tenants
+        }
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class TenantMetrics:
+    """Per-tenant request metrics rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = defaultdict(int)
+        self._duration_sum = defaultdict(float)
+        self._duration_count = defaultdict(int)
+        self._rejected = defaultdict(int)
+        self._evictions = defaultdict(int)
+
+    def observe(self, tenant_id, endpoint, status, seconds):
+        with self._lock:
+            self._requests[(tenant_id, endpoint, status)] += 1
+            self._duration_sum[(tenant_id, endpoint)] += seconds
+            self._duration_count[(tenant_id, endpoint)] += 1
+
+    def rejected(self, tenant_id):
+        with self._lock:
+            self._rejected[tenant_id] += 1
+
+    def evicted(self, tenant_id):
+        with self._lock:
+            self._evictions[tenant_id] += 1
+
+    def render(self, registry):
+        lines = []
+        with self._lock:
+            lines.append('# TYPE ai_requests_total counter')
+            for (tenant_id, endpoint, status), count in sorted(self._requests.items()):
+                lines.append(
+                    f'ai_requests_total{{tenant="{_escape(tenant_id)}",endpoint="{_escape(endpoint)}",'
+                    f'status="{status}"}} {count}'
+                )
+            lines.append('# TYPE ai_request_duration_seconds summary')
+            for (tenant_id, endpoint), total in sorted(self._duration_sum.items()):
+                labels = f'tenant="{_escape(tenant_id)}",endpoint="{_escape(endpoint)}"'
+                lines.append(f'ai_request_duration_seconds_sum{{{labels}}} {total:.6f}')
+                lines.append(f'ai_request_duration_seconds_count{{{labels}}} {self._duration_count[(tenant_id, endpoint)]}')
+            lines.append('# TYPE ai_requests_rejected_total counter')
+            for tenant_id, count in sorted(self._rejected.items()):
+                lines.append(f'ai_requests_rejected_total{{tenant="{_escape(tenant_id)}"}} {count}')
+            lines.append('# TYPE ai_tenant_evictions_total counter')
+            for tenant_id, count in sorted(self._evictions.items()):
+                lines.append(f'ai_tenant_evictions_total{{tenant="{_escape(tenant_id)}"}} {count}')
+
+        gauges = (
+            ('ai_tenant_memory_bytes', 'memory_bytes'),
+            ('ai_tenant_memory_budget_bytes', 'memory_budget_bytes'),
+            ('ai_tenant_inflight_requests', 'inflight'),
+            ('ai_tenant_max_concurrency', 'max_concurrency')
+        )
+        stats = registry.stats()
+        for name, key in gauges:
+            lines.append(f'# TYPE {name} gauge')
+            for tenant_id, values in sorted(stats.items()):
+                lines.append(f'{name}{{tenant="{_escape(tenant_id)}"}} {values[key]}')
+        return '\n'.join(lines) + '\n'